@@ -1,26 +1,208 @@
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import os
 import json
 import argparse
+import csv
+import random
+import re
+import threading
 import time
 import logging
 import sys
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pykis import PyKis
 
+try:
+    import pyarrow  # noqa: F401
+    _CSV_ENGINE = 'pyarrow'
+    _STR_DTYPE = 'string[pyarrow]'  # 문자열 컬럼을 Arrow 버퍼로 유지 (해시/비교 벡터화)
+except ImportError:
+    # pyarrow가 없으면 pandas 기본 C 엔진 + object 문자열 사용
+    _CSV_ENGINE = 'c'
+    _STR_DTYPE = str
+
 # 투자 설정
 MAX_RETRIES = 3  # 최대 재시도 횟수
-RETRY_DELAY = 1  # 재시도 간 대기 시간 (초)
-ORDER_DELAY = 0.5  # 주문 간 대기 시간 (초)
+BACKOFF_BASE = 1.0  # 재시도 백오프 기본 대기 시간 (초)
+BACKOFF_MAX = 30.0  # 재시도 백오프 대기 시간 상한 (초)
+JITTER = 0.5  # 재시도 대기 시간 지터 비율 (±50%)
+ORDER_DELAY = 0.5  # 주문 간 최소 간격 (초)
+MAX_ORDER_WORKERS = 8  # 동시 주문 제출 스레드 수
 REBALANCE_WAIT_TIME = 60  # 리밸런싱 매도 후 매수 대기 시간 (초)
 EXECUTION_LOG_FILE = "portfolio_execution_log.json"  # 실행 기록 파일
-REBALANCING_MONTHS = [3, 6, 9, 12]  # 리밸런싱 실행 월
+REBALANCING_MONTHS = frozenset({3, 6, 9, 12})  # 리밸런싱 실행 월
 LOG_DIR = "logs"  # 로그 디렉토리
 
+# 결과 메시지 템플릿 (행마다 f-string을 새로 만들지 않도록 모듈 상수로)
+_MSG_SELL = '{}주 매도'
+_MSG_LIQUIDATE = '{}주 전량 매도'
+_MSG_SELL_GOAL0 = '{}주 전량 매도 (목표0)'
+_MSG_BUY = '{}주 매수'
+
+# 재시도 불가능한 주문 오류 패턴 (문자열을 한 번만 스캔하도록 정규식으로 컴파일)
+_NO_RETRY_RE = re.compile(r'잔고|부족|수량|불가|영업일|장마감|장종료|장시작전|매매거래정지')
+
 # 전역 로거
 logger = None
 
+# 동시 주문 제출 수 제한 (KIS 초당 요청 제한 대응)
+_order_semaphore = threading.BoundedSemaphore(MAX_ORDER_WORKERS)
+
+# kis.stock() 래퍼 객체 캐시: (PyKis 객체 id, 종목코드) -> KisStock
+_stock_cache = {}
+
+
+def _get_stock(kis, code):
+    """
+    kis.stock() 결과 캐시 조회
+
+    재시도마다, 그리고 매도 후 매수 경로에서 같은 종목의 래퍼 객체를
+    다시 만들지 않도록 한 번 생성한 객체를 재사용한다.
+
+    Args:
+        kis: PyKis 객체
+        code: 종목코드
+
+    Returns:
+        KisStock: 캐시된 종목 객체
+    """
+    key = (id(kis), code)
+    stock = _stock_cache.get(key)
+    if stock is None:
+        stock = kis.stock(code)
+        _stock_cache[key] = stock
+    return stock
+
+
+def _submit_order(kis, code, side, qty, price=None, condition=None):
+    """
+    세마포어로 동시 제출 수를 제한하며 주문 1건 제출
+
+    Args:
+        kis: PyKis 객체
+        code: 종목코드
+        side: 'sell' 또는 'buy'
+        qty: 주문 수량
+        price: 주문 가격 (시장가는 None)
+        condition: 주문 조건 (최유리지정가는 'best')
+
+    Returns:
+        주문 객체
+    """
+    with _order_semaphore:
+        stock = _get_stock(kis, code)
+        if side == 'sell':
+            order = stock.sell(price=price, qty=qty, condition=condition, execution=None)
+        else:
+            order = stock.buy(price=price, qty=qty, condition=condition, execution=None)
+        # 세마포어를 쥔 채 최소 간격만 유지 → 전체 제출 속도가 상한을 넘지 않음
+        time.sleep(ORDER_DELAY)
+        return order
+
+
+def _retry_sell(kis, code, qty, name=''):
+    """
+    시장가 매도 주문 + 재시도
+
+    Args:
+        kis: PyKis 객체
+        code: 종목코드
+        qty: 매도 수량
+        name: 종목명 (로그용)
+
+    Returns:
+        tuple: (성공 여부, 주문 객체 또는 None, 오류 문자열 또는 None, 시도 횟수)
+    """
+    error = None
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            if attempt > 1:
+                logger.info(f"[매도 재시도 {attempt}/{MAX_RETRIES}] {code} {name}")
+                # 지수 백오프 + 지터: 동시 재시도가 한 시점에 몰리지 않도록 분산
+                time.sleep(min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1))) * (1.0 + random.uniform(-JITTER, JITTER)))
+
+            # 시장가 매도
+            order = _submit_order(kis, code, 'sell', qty)
+
+            logger.info(f"[매도 성공] 주문번호: {order.number if hasattr(order, 'number') else 'N/A'}")
+            return True, order, None, attempt
+
+        except Exception as e:
+            error = str(e)
+
+            # 재시도 불가능한 오류 체크 (키워드가 한글이므로 lower() 불필요)
+            if _NO_RETRY_RE.search(error):
+                logger.info(f"[매도 실패] {code} {name}: {error} (재시도 불가)")
+                return False, None, error, attempt
+
+            if attempt < MAX_RETRIES:
+                logger.info(f"[매도 오류] {code} {name}: {error} (재시도 예정)")
+            else:
+                logger.info(f"[매도 실패] {code} {name}: {error} (최대 재시도 횟수 초과)")
+
+    return False, None, error, MAX_RETRIES
+
+
+def _retry_buy(kis, code, qty, price, name='', is_virtual=False):
+    """
+    최유리지정가 매수 주문 + 재시도
+
+    Args:
+        kis: PyKis 객체
+        code: 종목코드
+        qty: 매수 수량
+        price: 전일 종가 (상한가 계산용)
+        name: 종목명 (로그용)
+        is_virtual: 모의투자 여부
+
+    Returns:
+        tuple: (성공 여부, 주문 객체 또는 None, 오류 문자열 또는 None, 시도 횟수)
+    """
+    # 상한가 계산 (전일 종가의 105%, 호가 단위로 올림)
+    max_price = round_to_tick_size(int(price * 1.05))
+
+    error = None
+
+    for attempt in range(1, MAX_RETRIES + 1):
+        try:
+            if attempt > 1:
+                logger.info(f"[재시도 {attempt}/{MAX_RETRIES}] {code} {name}")
+                # 지수 백오프 + 지터: 동시 재시도가 한 시점에 몰리지 않도록 분산
+                time.sleep(min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1))) * (1.0 + random.uniform(-JITTER, JITTER)))
+            else:
+                if is_virtual:
+                    logger.info(f"[매수] {code} {name}: 최유리지정가, 수량={qty}주, 상한가={max_price:,}원 (전일종가: {price:,}원)")
+                else:
+                    logger.info(f"[매수] {code} {name}: 최유리지정가, 수량={qty}주 (실전: price=0)")
+
+            # 최유리지정가 매수 주문
+            # 실전투자: price=0, 모의투자: 상한가 지정
+            order_price = max_price if is_virtual else 0
+            order = _submit_order(kis, code, 'buy', qty, price=order_price, condition='best')
+
+            logger.info(f"[성공] 주문번호: {order.number if hasattr(order, 'number') else 'N/A'}")
+            return True, order, None, attempt
+
+        except Exception as e:
+            error = str(e)
+
+            # 재시도 불가능한 오류 체크 (키워드가 한글이므로 lower() 불필요)
+            if _NO_RETRY_RE.search(error):
+                logger.info(f"[실패] {code} {name}: {error} (재시도 불가)")
+                return False, None, error, attempt
+
+            if attempt < MAX_RETRIES:
+                logger.info(f"[오류] {code} {name}: {error} (재시도 예정)")
+            else:
+                logger.info(f"[실패] {code} {name}: {error} (최대 재시도 횟수 초과)")
+
+    return False, None, error, MAX_RETRIES
+
 
 def setup_logger():
     """
@@ -75,17 +257,22 @@ def get_latest_portfolio_file():
     """
     portfolio_dir = Path(__file__).parent / "portfolio"
 
-    if not portfolio_dir.exists():
+    # 디렉토리를 한 번만 훑으며 최신 파일명 추적
+    # (파일명의 날짜가 ISO 형식이라 문자열 비교가 곧 날짜 비교)
+    best = None
+    try:
+        with os.scandir(portfolio_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith('portfolio_') and name.endswith('.csv') and (best is None or name > best):
+                    best = name
+    except FileNotFoundError:
         raise FileNotFoundError(f"portfolio 폴더가 존재하지 않습니다: {portfolio_dir}")
 
-    # portfolio_*.csv 파일들 찾기
-    portfolio_files = list(portfolio_dir.glob("portfolio_*.csv"))
-
-    if not portfolio_files:
+    if best is None:
         raise FileNotFoundError(f"portfolio 폴더에 포트폴리오 파일이 없습니다: {portfolio_dir}")
 
-    # 파일명에서 날짜 추출하여 가장 최신 파일 찾기
-    latest_file = max(portfolio_files, key=lambda f: f.stem.split('_')[1])
+    latest_file = portfolio_dir / best
 
     logger.info(f"최신 포트폴리오 파일: {latest_file.name}")
     return latest_file
@@ -103,7 +290,8 @@ def calculate_quantities(portfolio_file, total_investment):
         pd.DataFrame: 매수 수량이 추가된 포트폴리오
     """
     # 포트폴리오 읽기 (종목코드는 문자열로)
-    df = pd.read_csv(portfolio_file, encoding='utf-8-sig', dtype={'code': str})
+    df = pd.read_csv(portfolio_file, encoding='utf-8-sig',
+                     dtype={'code': _STR_DTYPE, '종목명': _STR_DTYPE}, engine=_CSV_ENGINE)
 
     # 종목코드 6자리 0 패딩
     df['code'] = df['code'].str.zfill(6)
@@ -115,10 +303,13 @@ def calculate_quantities(portfolio_file, total_investment):
     logger.info(f"종목 수: {num_stocks}개")
     logger.info(f"종목당 투자액: {amount_per_stock:,.0f}원")
 
-    # 수량 계산
+    # 수량 계산 (NumPy 배열 연산: 중간 Series 할당 없이 한 번에)
+    prices = df['end_price'].to_numpy(np.float64)
+    qty = (amount_per_stock // prices).astype(np.int64)
+
     df['투자액'] = amount_per_stock
-    df['매수수량'] = (df['투자액'] / df['end_price']).astype(int)
-    df['실투자액'] = df['매수수량'] * df['end_price']
+    df['매수수량'] = qty
+    df['실투자액'] = qty * prices
 
     # 컬럼 순서 재정렬
     cols = ['code', '종목명', 'end_price', '매수수량', '투자액', '실투자액',
@@ -280,22 +471,25 @@ def get_current_holdings(kis):
         dict: {종목코드: {'qty': 보유수량, 'name': 종목명}} 딕셔너리
     """
     try:
-        holdings = {}
         account = kis.account()
         balance = account.balance()
 
-        # balance 객체에서 보유 종목 정보 추출
-        if hasattr(balance, 'stocks') and balance.stocks:
-            for stock in balance.stocks:
-                # symbol 또는 code 속성 사용
-                code = getattr(stock, 'symbol', getattr(stock, 'code', None))
-                if code:
-                    # 종목코드 6자리 0 패딩
-                    code = str(code).zfill(6)
-                    qty = int(stock.qty)
-                    name = getattr(stock, 'name', '(이름없음)')
-                    if qty > 0:
-                        holdings[code] = {'qty': qty, 'name': name}
+        # balance 객체에서 보유 종목 정보를 원시 튜플로 수집
+        raw = []
+        stocks = getattr(balance, 'stocks', None)
+        if stocks:
+            for stock in stocks:
+                # symbol 또는 code 속성 사용 (기본값 getattr 중첩은 내부 호출이 항상 평가됨)
+                code = getattr(stock, 'symbol', None) or getattr(stock, 'code', None)
+                if not code:
+                    continue
+                qty = int(stock.qty)
+                if qty <= 0:
+                    continue
+                raw.append((code, qty, getattr(stock, 'name', '(이름없음)')))
+
+        # 종목코드 6자리 0 패딩은 루프 밖 comprehension 한 번으로 처리
+        holdings = {str(code).zfill(6): {'qty': qty, 'name': name} for code, qty, name in raw}
 
         logger.info(f"\n현재 보유 종목 수: {len(holdings)}개")
         if holdings:
@@ -311,6 +505,43 @@ def get_current_holdings(kis):
         return {}
 
 
+def _wait_for_cash(kis, needed_krw, timeout=REBALANCE_WAIT_TIME, interval=2.0):
+    """
+    매도 대금이 예수금에 반영될 때까지 폴링
+
+    시장가 매도는 보통 수 초 내에 체결되어 예수금에 잡히므로 고정 대기
+    대신 짧은 간격으로 확인하고, 안전망으로 timeout까지만 기다린다.
+    잔고 조회가 실패하면 남은 시간만큼 기존 방식대로 잔다.
+
+    Args:
+        kis: PyKis 객체
+        needed_krw: 기다릴 예수금 (KRW)
+        timeout: 최대 대기 시간 (초)
+        interval: 폴링 간격 (초)
+
+    Returns:
+        bool: 예수금이 needed_krw 이상 확인되면 True
+    """
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        try:
+            deposits = kis.account().balance().deposits
+            cash = int(deposits['KRW'].amount) if 'KRW' in deposits else 0
+        except Exception as e:
+            # 잔고 조회가 안 되면 남은 시간 동안 기존 고정 대기로 폴백
+            logger.warning(f" 예수금 조회 실패, 남은 시간 동안 대기: {e}")
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            return False
+
+        if cash >= needed_krw:
+            return True
+
+        time.sleep(interval)
+
+    return False
+
+
 def execute_buy_orders(kis, df_buy, is_virtual=False):
     """
     계산된 수량으로 매수 주문 실행 (리밸런싱 포함, 최우선 지정가, 재시도 로직 포함)
@@ -320,6 +551,9 @@ def execute_buy_orders(kis, df_buy, is_virtual=False):
     2. 보유량 < 목표량: (목표량 - 보유량)만큼 최우선 지정가 매수
     3. 보유량 = 목표량: 아무 작업도 하지 않음
 
+    주문 제출은 단계별(전량 매도 → 리밸런싱 매도 → 매수)로 스레드 풀에서
+    동시에 수행하고, 세마포어로 KIS 요청 속도 상한을 지킨다.
+
     Args:
         kis: PyKis 객체
         df_buy: 매수 계획이 담긴 DataFrame
@@ -329,334 +563,247 @@ def execute_buy_orders(kis, df_buy, is_virtual=False):
         list: 주문 결과 리스트
     """
     results = []
+    results_lock = threading.Lock()
 
     # 현재 보유 종목 조회
     holdings = get_current_holdings(kis)
 
-    # 매수 예정 종목 코드 set
-    target_codes = set(df_buy['code'].tolist())
+    # 매수 단계에 필요한 총액 (매도 대금 반영 폴링 기준)
+    needed_cash = int(df_buy['실투자액'].sum())
 
     logger.info("\n" + "=" * 80)
     logger.info("매수 주문 실행 (리밸런싱 포함)")
     logger.info("=" * 80)
 
-    # 1단계: 매수 예정에 없는 보유 종목 전량 매도
-    non_target_holdings = {code: info for code, info in holdings.items() if code not in target_codes}
+    def _sell_worker(task):
+        """단일 매도 주문 결과 기록 (워커 스레드에서 실행)"""
+        ok, order, error, _ = _retry_sell(kis, task['code'], task['qty'], task['name'])
+
+        if ok:
+            entry = {
+                'code': task['code'],
+                'name': task['name'],
+                'status': task['success_status'],
+                'order': order,
+                'message': task['success_msg'],
+                'current_qty': task['current_qty'],
+                'target_qty': task['target_qty']
+            }
+        else:
+            entry = {
+                'code': task['code'],
+                'name': task['name'],
+                'status': task['fail_status'],
+                'error': error,
+                'message': task['fail_msg'],
+                'current_qty': task['current_qty'],
+                'target_qty': task['target_qty']
+            }
+
+        with results_lock:
+            results.append(entry)
+
+        return ok
+
+    def _buy_worker(task):
+        """단일 매수 주문 결과 기록 (워커 스레드에서 실행)"""
+        ok, order, error, attempts = _retry_buy(
+            kis, task['code'], task['qty'], task['price'], task['name'], is_virtual)
+
+        if ok:
+            entry = {
+                'code': task['code'],
+                'name': task['name'],
+                'status': 'buy_success',
+                'order': order,
+                'attempts': attempts,
+                'message': _MSG_BUY.format(task['qty']),
+                'current_qty': task['current_qty'],
+                'target_qty': task['target_qty']
+            }
+        else:
+            entry = {
+                'code': task['code'],
+                'name': task['name'],
+                'status': 'buy_failed',
+                'error': error,
+                'attempts': attempts,
+                'message': '매수 실패',
+                'current_qty': task['current_qty'],
+                'target_qty': task['target_qty']
+            }
+
+        with results_lock:
+            results.append(entry)
+
+        return ok
+
+    # 1단계: 매수 예정에 없는 보유 종목 전량 매도 (동시 제출)
+    # 보유 코드 전체를 배치 해시 조회(isin) 한 번으로 분류
+    holding_codes = pd.Series(list(holdings.keys()), dtype=_STR_DTYPE)
+    in_target = holding_codes.isin(df_buy['code'])
+    non_target_holdings = {code: holdings[code] for code in holding_codes[~in_target]}
 
     if non_target_holdings:
         logger.info(f"\n[전량 매도] 매수 예정에 없는 보유 종목 {len(non_target_holdings)}개를 매도합니다.")
 
-        for code, info in non_target_holdings.items():
-            qty = info['qty']
-            logger.info(f"\n[전량 매도] {code}: {qty}주 매도")
-
-            # 시장가 매도 재시도 로직
-            sell_success = False
-            sell_error = None
-
-            for sell_attempt in range(1, MAX_RETRIES + 1):
-                try:
-                    if sell_attempt > 1:
-                        logger.info(f"[매도 재시도 {sell_attempt}/{MAX_RETRIES}] {code}")
-                        time.sleep(RETRY_DELAY * (sell_attempt - 1))
-
-                    # 시장가 전량 매도
-                    sell_order = kis.stock(code).sell(price=None, qty=qty, condition=None, execution=None)
-
-                    logger.info(f"[매도 성공] 주문번호: {sell_order.number if hasattr(sell_order, 'number') else 'N/A'}")
-                    sell_success = True
-                    break
-
-                except Exception as e:
-                    sell_error = str(e)
-                    error_msg = sell_error.lower()
-
-                    # 재시도 불가능한 오류 체크
-                    no_retry_keywords = ['잔고', '부족', '수량', '불가', '영업일', '장마감', '장종료', '장시작전', '매매거래정지']
-                    if any(keyword in error_msg for keyword in no_retry_keywords):
-                        logger.info(f"[매도 실패] {code}: {sell_error} (재시도 불가)")
-                        break
-
-                    if sell_attempt < MAX_RETRIES:
-                        logger.info(f"[매도 오류] {code}: {sell_error} (재시도 예정)")
-                    else:
-                        logger.info(f"[매도 실패] {code}: {sell_error} (최대 재시도 횟수 초과)")
-
-            if not sell_success:
-                results.append({
-                    'code': code,
-                    'name': '(매수예정외)',
-                    'status': 'liquidate_failed',
-                    'error': sell_error,
-                    'message': '전량 매도 실패',
-                    'current_qty': qty,
-                    'target_qty': 0
-                })
-            else:
-                results.append({
-                    'code': code,
-                    'name': '(매수예정외)',
-                    'status': 'liquidated',
-                    'order': sell_order,
-                    'message': f'{qty}주 전량 매도',
-                    'current_qty': qty,
-                    'target_qty': 0
-                })
-
-            # 주문 간 딜레이
-            time.sleep(ORDER_DELAY)
-
-        # 전량 매도 후 대기
-        if any(r['status'] == 'liquidated' for r in results):
-            logger.info(f"\n[대기] 전량 매도 완료 후 {REBALANCE_WAIT_TIME}초 대기...")
-            time.sleep(REBALANCE_WAIT_TIME)
-
-    # 2단계: 매수 예정 종목 리밸런싱
-    for idx, row in df_buy.iterrows():
-        code = row['code']
-        name = row['종목명']
-        price = int(row['end_price'])
-        target_qty = int(row['매수수량'])
-        current_qty = holdings.get(code, {}).get('qty', 0)
-
-        # 목표 수량이 0일 때 처리
-        if target_qty <= 0:
-            if current_qty > 0:
-                # 보유량이 있으면 전량 매도
-                logger.info(f"[리밸런싱 매도] {code} {name}: 현재 {current_qty}주 → 목표 0주 (전량 매도)")
-
-                # 시장가 매도 재시도 로직
-                sell_success = False
-                sell_error = None
-
-                for sell_attempt in range(1, MAX_RETRIES + 1):
-                    try:
-                        if sell_attempt > 1:
-                            logger.info(f"[매도 재시도 {sell_attempt}/{MAX_RETRIES}] {code} {name}")
-                            time.sleep(RETRY_DELAY * (sell_attempt - 1))
-
-                        # 시장가 전량 매도
-                        sell_order = kis.stock(code).sell(price=None, qty=current_qty, condition=None, execution=None)
-
-                        logger.info(f"[매도 성공] 주문번호: {sell_order.number if hasattr(sell_order, 'number') else 'N/A'}")
-                        sell_success = True
-                        break
-
-                    except Exception as e:
-                        sell_error = str(e)
-                        error_msg = sell_error.lower()
-
-                        # 재시도 불가능한 오류 체크
-                        no_retry_keywords = ['잔고', '부족', '수량', '불가', '영업일', '장마감', '장종료', '장시작전', '매매거래정지']
-                        if any(keyword in error_msg for keyword in no_retry_keywords):
-                            logger.info(f"[매도 실패] {code} {name}: {sell_error} (재시도 불가)")
-                            break
-
-                        if sell_attempt < MAX_RETRIES:
-                            logger.info(f"[매도 오류] {code} {name}: {sell_error} (재시도 예정)")
-                        else:
-                            logger.info(f"[매도 실패] {code} {name}: {sell_error} (최대 재시도 횟수 초과)")
-
-                if not sell_success:
-                    results.append({
-                        'code': code,
-                        'name': name,
-                        'status': 'sell_failed',
-                        'error': sell_error,
-                        'message': '목표0 전량 매도 실패',
-                        'current_qty': current_qty,
-                        'target_qty': 0
-                    })
-                else:
-                    results.append({
-                        'code': code,
-                        'name': name,
-                        'status': 'sell_success',
-                        'order': sell_order,
-                        'message': f'{current_qty}주 전량 매도 (목표0)',
-                        'current_qty': current_qty,
-                        'target_qty': 0
-                    })
-
-                    # 매도 후 대기
-                    logger.info(f"[대기] {REBALANCE_WAIT_TIME}초 대기...")
-                    time.sleep(REBALANCE_WAIT_TIME)
-            else:
-                # 보유량도 없으면 스킵
-                logger.info(f"[SKIP] {code} {name}: 목표 0, 보유 0 (변동 없음)")
-                results.append({
-                    'code': code,
-                    'name': name,
-                    'status': 'skipped',
-                    'message': '목표0 보유0'
-                })
-            continue
-
-        # 수량 차이 계산
-        delta = target_qty - current_qty
-
-        if delta == 0:
-            # 보유량과 목표량이 같음 - 거래 불필요
-            logger.info(f"[유지] {code} {name}: 현재 {current_qty}주 보유, 목표 {target_qty}주 (변동 없음)")
-            results.append({
+        liquidate_tasks = [
+            {
                 'code': code,
-                'name': name,
-                'status': 'unchanged',
-                'message': '수량 변동 없음',
-                'current_qty': current_qty,
-                'target_qty': target_qty
-            })
-            continue
-
-        elif delta < 0:
-            # 보유량 > 목표량 → 매도 필요
-            sell_qty = abs(delta)
-            logger.info(f"\n[리밸런싱 매도] {code} {name}: 현재 {current_qty}주 → 목표 {target_qty}주 ({sell_qty}주 매도)")
-
-            # 시장가 매도 재시도 로직
-            sell_success = False
-            sell_error = None
-
-            for sell_attempt in range(1, MAX_RETRIES + 1):
-                try:
-                    if sell_attempt > 1:
-                        logger.info(f"[매도 재시도 {sell_attempt}/{MAX_RETRIES}] {code} {name}")
-                        time.sleep(RETRY_DELAY * (sell_attempt - 1))
-
-                    # 시장가 매도
-                    sell_order = kis.stock(code).sell(price=None, qty=sell_qty, condition=None, execution=None)
-
-                    logger.info(f"[매도 성공] 주문번호: {sell_order.number if hasattr(sell_order, 'number') else 'N/A'}")
-                    sell_success = True
-                    break
-
-                except Exception as e:
-                    sell_error = str(e)
-                    error_msg = sell_error.lower()
-
-                    # 재시도 불가능한 오류 체크
-                    no_retry_keywords = ['잔고', '부족', '수량', '불가', '영업일', '장마감', '장종료', '장시작전', '매매거래정지']
-                    if any(keyword in error_msg for keyword in no_retry_keywords):
-                        logger.info(f"[매도 실패] {code} {name}: {sell_error} (재시도 불가)")
-                        break
-
-                    if sell_attempt < MAX_RETRIES:
-                        logger.info(f"[매도 오류] {code} {name}: {sell_error} (재시도 예정)")
-                    else:
-                        logger.info(f"[매도 실패] {code} {name}: {sell_error} (최대 재시도 횟수 초과)")
-
-            if not sell_success:
-                results.append({
-                    'code': code,
-                    'name': name,
-                    'status': 'sell_failed',
-                    'error': sell_error,
-                    'message': '리밸런싱 매도 실패',
-                    'current_qty': current_qty,
-                    'target_qty': target_qty
-                })
-            else:
-                results.append({
-                    'code': code,
-                    'name': name,
-                    'status': 'sell_success',
-                    'order': sell_order,
-                    'message': f'{sell_qty}주 매도',
-                    'current_qty': current_qty,
-                    'target_qty': target_qty
-                })
-
-                # 매도 후 대기
-                logger.info(f"[대기] {REBALANCE_WAIT_TIME}초 대기...")
-                time.sleep(REBALANCE_WAIT_TIME)
+                'name': '(매수예정외)',
+                'qty': info['qty'],
+                'current_qty': info['qty'],
+                'target_qty': 0,
+                'success_status': 'liquidated',
+                'fail_status': 'liquidate_failed',
+                'success_msg': _MSG_LIQUIDATE.format(info['qty']),
+                'fail_msg': '전량 매도 실패'
+            }
+            for code, info in non_target_holdings.items()
+        ]
+
+        with ThreadPoolExecutor(max_workers=MAX_ORDER_WORKERS) as executor:
+            liquidated_any = any(list(executor.map(_sell_worker, liquidate_tasks)))
+
+        # 전량 매도 후 매도 대금 반영 대기 (고정 60초 대신 예수금 폴링)
+        if liquidated_any:
+            logger.info(f"\n[대기] 전량 매도 대금 반영 확인 중 (최대 {REBALANCE_WAIT_TIME}초)...")
+            _wait_for_cash(kis, needed_cash)
+
+    # 2단계: 매수 예정 종목 분류
+    # 행별 3중 분기 대신 배열 연산으로 액션을 한 번에 라우팅하고,
+    # 액션별로 단일 경로의 루프만 돈다
+    buy_codes = df_buy['code'].tolist()
+    buy_names = df_buy['종목명'].tolist()
+    buy_prices = df_buy['end_price'].astype(int).tolist()
+
+    # 보유 수량은 행마다 dict 조회하지 않고 해시 조인(.map) 한 번으로 매핑
+    holdings_s = pd.Series({c: info['qty'] for c, info in holdings.items()}, dtype='int64')
+    target_arr = df_buy['매수수량'].to_numpy(np.int64)
+    current_arr = df_buy['code'].map(holdings_s).fillna(0).astype('int64').to_numpy()
+    delta_arr = target_arr - current_arr
+
+    actions = np.select(
+        [
+            (target_arr <= 0) & (current_arr > 0),
+            target_arr <= 0,
+            delta_arr == 0,
+            delta_arr < 0,
+        ],
+        ['liquidate0', 'skip', 'unchanged', 'sell'],
+        default='buy'
+    )
 
-        else:
-            # 보유량 < 목표량 → 매수 필요
-            buy_qty = delta
-            logger.info(f"\n[리밸런싱 매수] {code} {name}: 현재 {current_qty}주 → 목표 {target_qty}주 ({buy_qty}주 매수)")
-
-            # 상한가 계산 (전일 종가의 105%, 호가 단위로 올림)
-            max_price = round_to_tick_size(int(price * 1.05))
-
-            # 매수 주문 재시도 로직
-            buy_success = False
-            last_error = None
-            attempt = 0
-
-            for attempt in range(1, MAX_RETRIES + 1):
-                try:
-                    if attempt > 1:
-                        logger.info(f"[재시도 {attempt}/{MAX_RETRIES}] {code} {name}")
-                        time.sleep(RETRY_DELAY * (attempt - 1))  # 지수 백오프
-                    else:
-                        if is_virtual:
-                            logger.info(f"[매수] {code} {name}: 최유리지정가, 수량={buy_qty}주, 상한가={max_price:,}원 (전일종가: {price:,}원)")
-                        else:
-                            logger.info(f"[매수] {code} {name}: 최유리지정가, 수량={buy_qty}주 (실전: price=0)")
-
-                    # 최유리지정가 매수 주문
-                    # 실전투자: price=0, 모의투자: 상한가 지정
-                    order_price = max_price if is_virtual else 0
-                    order = kis.stock(code).buy(price=order_price, qty=buy_qty, condition='best', execution=None)
-
-                    logger.info(f"[성공] 주문번호: {order.number if hasattr(order, 'number') else 'N/A'}")
-                    results.append({
-                        'code': code,
-                        'name': name,
-                        'status': 'buy_success',
-                        'order': order,
-                        'attempts': attempt,
-                        'message': f'{buy_qty}주 매수',
-                        'current_qty': current_qty,
-                        'target_qty': target_qty
-                    })
-                    buy_success = True
-                    break
-
-                except Exception as e:
-                    last_error = str(e)
-                    error_msg = last_error.lower()
-
-                    # 재시도 불가능한 오류 체크
-                    no_retry_keywords = ['잔고', '부족', '수량', '불가', '영업일', '장마감', '장종료', '장시작전', '매매거래정지']
-                    if any(keyword in error_msg for keyword in no_retry_keywords):
-                        logger.info(f"[실패] {code} {name}: {last_error} (재시도 불가)")
-                        break
-
-                    # 마지막 시도가 아니면 재시도
-                    if attempt < MAX_RETRIES:
-                        logger.info(f"[오류] {code} {name}: {last_error} (재시도 예정)")
-                    else:
-                        logger.info(f"[실패] {code} {name}: {last_error} (최대 재시도 횟수 초과)")
-
-            # 실패한 경우 결과 기록
-            if not buy_success:
-                results.append({
-                    'code': code,
-                    'name': name,
-                    'status': 'buy_failed',
-                    'error': last_error,
-                    'attempts': attempt,
-                    'message': '매수 실패',
-                    'current_qty': current_qty,
-                    'target_qty': target_qty
-                })
-
-        # 주문 간 딜레이 (rate limit 방지)
-        if idx < len(df_buy) - 1:  # 마지막 주문이 아닌 경우
-            time.sleep(ORDER_DELAY)
+    sell_tasks = []
+    buy_tasks = []
+
+    # 목표 0 + 보유 있음 → 전량 매도
+    for i in np.flatnonzero(actions == 'liquidate0'):
+        code, name, current_qty = buy_codes[i], buy_names[i], int(current_arr[i])
+        logger.info(f"[리밸런싱 매도] {code} {name}: 현재 {current_qty}주 → 목표 0주 (전량 매도)")
+        sell_tasks.append({
+            'code': code,
+            'name': name,
+            'qty': current_qty,
+            'current_qty': current_qty,
+            'target_qty': 0,
+            'success_status': 'sell_success',
+            'fail_status': 'sell_failed',
+            'success_msg': _MSG_SELL_GOAL0.format(current_qty),
+            'fail_msg': '목표0 전량 매도 실패'
+        })
+
+    # 목표 0 + 보유 0 → 스킵
+    for i in np.flatnonzero(actions == 'skip'):
+        code, name = buy_codes[i], buy_names[i]
+        logger.info(f"[SKIP] {code} {name}: 목표 0, 보유 0 (변동 없음)")
+        results.append({
+            'code': code,
+            'name': name,
+            'status': 'skipped',
+            'message': '목표0 보유0'
+        })
+
+    # 보유량 == 목표량 → 거래 불필요
+    for i in np.flatnonzero(actions == 'unchanged'):
+        code, name, qty = buy_codes[i], buy_names[i], int(target_arr[i])
+        logger.info(f"[유지] {code} {name}: 현재 {qty}주 보유, 목표 {qty}주 (변동 없음)")
+        results.append({
+            'code': code,
+            'name': name,
+            'status': 'unchanged',
+            'message': '수량 변동 없음',
+            'current_qty': qty,
+            'target_qty': qty
+        })
+
+    # 보유량 > 목표량 → 초과분 매도
+    for i in np.flatnonzero(actions == 'sell'):
+        code, name = buy_codes[i], buy_names[i]
+        current_qty, target_qty = int(current_arr[i]), int(target_arr[i])
+        sell_qty = current_qty - target_qty
+        logger.info(f"[리밸런싱 매도] {code} {name}: 현재 {current_qty}주 → 목표 {target_qty}주 ({sell_qty}주 매도)")
+        sell_tasks.append({
+            'code': code,
+            'name': name,
+            'qty': sell_qty,
+            'current_qty': current_qty,
+            'target_qty': target_qty,
+            'success_status': 'sell_success',
+            'fail_status': 'sell_failed',
+            'success_msg': _MSG_SELL.format(sell_qty),
+            'fail_msg': '리밸런싱 매도 실패'
+        })
+
+    # 보유량 < 목표량 → 부족분 매수
+    for i in np.flatnonzero(actions == 'buy'):
+        code, name = buy_codes[i], buy_names[i]
+        current_qty, target_qty = int(current_arr[i]), int(target_arr[i])
+        buy_qty = target_qty - current_qty
+        logger.info(f"[리밸런싱 매수] {code} {name}: 현재 {current_qty}주 → 목표 {target_qty}주 ({buy_qty}주 매수)")
+        buy_tasks.append({
+            'code': code,
+            'name': name,
+            'qty': buy_qty,
+            'price': buy_prices[i],
+            'current_qty': current_qty,
+            'target_qty': target_qty
+        })
+
+    # 3단계: 리밸런싱 매도 동시 제출 → 매도 대금 반영 대기
+    if sell_tasks:
+        with ThreadPoolExecutor(max_workers=MAX_ORDER_WORKERS) as executor:
+            sold_any = any(list(executor.map(_sell_worker, sell_tasks)))
+
+        if sold_any:
+            # 매수 주문이 실제로 쓸 금액만큼 예수금이 차면 바로 진행
+            buy_need = sum(task['qty'] * task['price'] for task in buy_tasks)
+            logger.info(f"[대기] 매도 대금 반영 확인 중 (최대 {REBALANCE_WAIT_TIME}초)...")
+            _wait_for_cash(kis, buy_need)
+
+    # 4단계: 매수 동시 제출
+    if buy_tasks:
+        with ThreadPoolExecutor(max_workers=MAX_ORDER_WORKERS) as executor:
+            list(executor.map(_buy_worker, buy_tasks))
 
     logger.info("=" * 80)
 
-    # 결과 요약
-    buy_success_count = sum(1 for r in results if r['status'] == 'buy_success')
-    sell_success_count = sum(1 for r in results if r['status'] == 'sell_success')
-    liquidated_count = sum(1 for r in results if r['status'] == 'liquidated')
-    buy_failed_count = sum(1 for r in results if r['status'] == 'buy_failed')
-    sell_failed_count = sum(1 for r in results if r['status'] == 'sell_failed')
-    liquidate_failed_count = sum(1 for r in results if r['status'] == 'liquidate_failed')
-    unchanged_count = sum(1 for r in results if r['status'] == 'unchanged')
-    skipped_count = sum(1 for r in results if r['status'] == 'skipped')
+    # 결과 요약 (리스트를 여덟 번 훑는 대신 한 번의 순회로 집계)
+    counts = Counter()
+    retry_count = 0
+    for r in results:
+        counts[r['status']] += 1
+        if r.get('attempts', 1) > 1:
+            retry_count += 1
+
+    buy_success_count = counts['buy_success']
+    sell_success_count = counts['sell_success']
+    liquidated_count = counts['liquidated']
+    buy_failed_count = counts['buy_failed']
+    sell_failed_count = counts['sell_failed']
+    liquidate_failed_count = counts['liquidate_failed']
+    unchanged_count = counts['unchanged']
+    skipped_count = counts['skipped']
 
     logger.info(f"\n주문 결과 요약:")
     if liquidated_count > 0:
@@ -674,14 +821,14 @@ def execute_buy_orders(kis, df_buy, is_virtual=False):
         logger.info(f"  건너뜀: {skipped_count}건")
 
     # 재시도 통계
-    retry_count = sum(1 for r in results if r.get('attempts', 1) > 1)
     if retry_count > 0:
         logger.info(f"\n재시도 성공: {retry_count}건")
 
     return results
 
 
-def main():
+def main(argv=None):
+    """스크립트 본체 (argv를 받아 같은 프로세스에서 바로 호출할 수 있음)"""
     # 명령줄 인수 파싱
     parser = argparse.ArgumentParser(description='포트폴리오 매수 계획 생성 및 주문 실행 (3, 6, 9, 12월 첫 거래일 자동 실행)')
     parser.add_argument('--execute', action='store_true', help='실제 매수 주문 실행 (기본: 계획만 출력)')
@@ -689,7 +836,7 @@ def main():
     parser.add_argument('--virtual', default=None, help='모의투자 계좌 secret 파일 경로 (옵션)')
     parser.add_argument('--investment', type=int, default=None, help='총 투자액 (원 단위, 기본: 현재 총평가금액 사용)')
     parser.add_argument('--force', action='store_true', help='이번 달 실행 기록 무시하고 강제 실행')
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # 로거 설정
     setup_logger()
@@ -707,7 +854,7 @@ def main():
         if not is_rebalancing_month():
             current_month = datetime.now().month
             logger.info(f"\n⏭️  현재 월({current_month}월)은 리밸런싱 월이 아닙니다.")
-            logger.info(f"   리밸런싱 월: {', '.join(map(str, REBALANCING_MONTHS))}월")
+            logger.info(f"   리밸런싱 월: {', '.join(map(str, sorted(REBALANCING_MONTHS)))}월")
             logger.info("\n종료합니다.")
             return
 
@@ -752,12 +899,15 @@ def main():
     logger.info("\n" + "=" * 80)
     logger.info("매수 계획")
     logger.info("=" * 80)
-    logger.info(f"\n{'종목코드':<10} {'종목명':<20} {'가격':>12} {'수량':>8} {'투자액':>15} {'실투자액':>15}")
-    logger.info("-" * 80)
-
-    for _, row in df_buy.iterrows():
-        logger.info(f"{row['code']:<10} {row['종목명']:<20} {row['end_price']:>12,.0f} {row['매수수량']:>8} "
-              f"{row['투자액']:>15,.0f} {row['실투자액']:>15,.0f}")
+    # 행별 출력 대신 테이블을 한 번에 포맷해서 단일 로그로 내보냄
+    plan_cols = ['code', '종목명', 'end_price', '매수수량', '투자액', '실투자액']
+    plan_fmts = {
+        'end_price': '{:,.0f}'.format,
+        '매수수량': '{:,}'.format,
+        '투자액': '{:,.0f}'.format,
+        '실투자액': '{:,.0f}'.format,
+    }
+    logger.info("\n" + df_buy[plan_cols].to_string(index=False, formatters=plan_fmts))
 
     logger.info("-" * 80)
     total_actual = df_buy['실투자액'].sum()
@@ -770,8 +920,12 @@ def main():
     date_str = base_name.split('_')[1]  # 2025-10-02
 
     output_file = portfolio_file.parent / f"buy_plan_{date_str}.csv"
-    df_buy.to_csv(output_file, index=False, encoding='utf-8-sig')
-    logger.info(f"\n매수 계획이 {output_file}에 저장되었습니다.")
+
+    # CSV 저장은 주문 실행과 독립적이므로 백그라운드 스레드에 맡기고
+    # 종료 직전에만 완료를 확인한다 (디스크 쓰기와 인증/주문 네트워크 IO 중첩)
+    writer_pool = ThreadPoolExecutor(max_workers=1)
+    plan_future = writer_pool.submit(df_buy.to_csv, output_file, index=False, encoding='utf-8-sig')
+    logger.info(f"\n매수 계획을 {output_file}에 저장합니다.")
 
     # 실행 옵션이 있을 경우 실제 주문 실행
     if args.execute:
@@ -782,11 +936,22 @@ def main():
         # 매수 주문 실행 (모의투자 여부 전달)
         results = execute_buy_orders(kis, df_buy, is_virtual=bool(args.virtual))
 
-        # 결과 저장
-        results_df = pd.DataFrame(results)
+        # 결과 저장 (DataFrame을 거치지 않고 dict 리스트를 바로 스트리밍)
         results_file = portfolio_file.parent / f"buy_results_{date_str}.csv"
-        results_df.to_csv(results_file, index=False, encoding='utf-8-sig')
-        logger.info(f"\n주문 결과가 {results_file}에 저장되었습니다.")
+
+        def _write_results():
+            fieldnames = sorted({key for r in results for key in r})
+            with open(results_file, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                # order 객체 등은 문자열로 변환해서 기록
+                writer.writerows(
+                    {key: ('' if value is None else str(value)) for key, value in r.items()}
+                    for r in results
+                )
+
+        results_future = writer_pool.submit(_write_results)
+        logger.info(f"\n주문 결과를 {results_file}에 저장합니다.")
 
         # 실행 성공 여부 판단 (매수/매도 실패가 없으면 성공)
         buy_failed_count = sum(1 for r in results if r['status'] == 'buy_failed')
@@ -801,10 +966,22 @@ def main():
             logger.info("\n🎉 리밸런싱 성공!")
         else:
             logger.info("\n⚠️  일부 주문이 실패했습니다. 결과를 확인하세요.")
+
+        try:
+            results_future.result()
+        except Exception as e:
+            logger.warning(f" 주문 결과 저장 실패: {e}")
     else:
         logger.info("\n💡 매수 주문을 실행하려면 --execute 옵션을 사용하세요.")
         logger.info(f"   예: python buy_portfolio.py --secret secret.json --execute")
 
+    # 백그라운드 CSV 쓰기 완료 확인 (오류가 있으면 여기서 드러남)
+    try:
+        plan_future.result()
+    except Exception as e:
+        logger.warning(f" 매수 계획 저장 실패: {e}")
+    writer_pool.shutdown()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -6,27 +6,129 @@ Created on 2025-11-14
 """
 
 import argparse
+import atexit
+import bisect
+import functools
 import json
 import logging
+import math
 import os
+import queue
+import random
+import re
 import sys
+import threading
 import time
+from logging.handlers import QueueHandler, QueueListener
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from dateutil.relativedelta import relativedelta
+import requests
+from requests.adapters import HTTPAdapter
 from pykis import PyKis, KisAuth, KisQuote
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(obj) -> bytes:
+    """JSON 직렬화 (orjson이 있으면 C 구현 사용)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+
+def _loads(data):
+    """JSON 역직렬화 (orjson이 있으면 C 구현 사용)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 # 투자 설정
 MAX_RETRIES = 3  # 최대 재시도 횟수
-RETRY_DELAY = 1  # 재시도 간 대기 시간 (초)
-ORDER_DELAY = 0.5  # 주문 간 대기 시간 (초)
+RETRY_DELAY = 1  # 재시도 기본 대기 시간 (초)
+RETRY_DELAY_MAX = 8.0  # 재시도 대기 시간 상한 (초)
+ORDER_RATE = 20.0  # KIS 초당 요청 상한 (문서 기준 20 req/s)
+ORDER_BURST = 20  # 토큰 버킷 버스트 허용량
 REBALANCE_WAIT_TIME = 60  # 리밸런싱 매도 후 매수 대기 시간 (초)
-EXECUTION_LOG_FILE = "gem_execution_log.json"  # 실행 기록 파일
+EXECUTION_LOG_FILE = "gem_execution_log.jsonl"  # 실행 기록 파일 (JSON Lines, append 전용)
+LEGACY_EXECUTION_LOG_FILE = "gem_execution_log.json"  # 구버전 실행 기록 (최초 1회 변환용)
 BUFFER_RATIO = 0.99  # 매수 시 투자액 버퍼 비율 (99%, 1% 여유)
 LOG_DIR = "logs"  # 로그 디렉토리
 
+# 재시도 여부 판단용 오류 패턴 (문자열을 한 번만 스캔하도록 정규식으로 컴파일)
+_NET_ERR_RE = re.compile(r'connection|timeout|remote|disconnect')
+_NO_RETRY_RE = re.compile(r'잔고|부족|수량|불가|영업일|장마감|장종료|장시작전|매매거래정지')
+
 # 전역 로거
 logger = None
 
+# kis.stock() 래퍼 객체 캐시: (PyKis 객체 id, 종목코드) -> KisStock
+_stock_cache = {}
+
+# 종목명 캐시: 종목코드 -> 종목명
+_stock_name_cache = {}
+
+
+class TokenBucket:
+    """
+    토큰 버킷 방식 요청 속도 제한기
+
+    주문마다 고정 시간을 자는 대신, 초당 rate개의 토큰을 채우고
+    토큰이 없을 때만 부족분만큼 대기한다. 버스트 범위 내에서는
+    대기 없이 연속 주문이 가능하다. 스레드 안전.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 1개를 획득할 때까지 대기 (필요할 때만 잔다)"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# 주문 경로 공용 속도 제한기
+_order_bucket = TokenBucket(rate=ORDER_RATE, burst=ORDER_BURST)
+
+
+def get_stock(kis, stock_code):
+    """
+    kis.stock() 결과 캐시 조회
+
+    동일 종목을 재시도/매도/매수 경로에서 반복 조회할 때
+    래퍼 객체 재생성(및 내부 메타데이터 조회)을 피한다.
+
+    Args:
+        kis: PyKis 객체
+        stock_code: 종목코드
+
+    Returns:
+        KisStock: 캐시된 종목 객체
+    """
+    key = (id(kis), stock_code)
+    stock = _stock_cache.get(key)
+    if stock is None:
+        stock = kis.stock(stock_code)
+        _stock_cache[key] = stock
+    return stock
+
 
 def setup_logger():
     """
@@ -35,8 +137,7 @@ def setup_logger():
     global logger
 
     # 로그 디렉토리 생성
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR)
+    os.makedirs(LOG_DIR, exist_ok=True)
 
     # 로그 파일명: gem_YYYYMMDD_HHMMSS.log
     log_filename = os.path.join(
@@ -61,17 +162,29 @@ def setup_logger():
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
 
     # 파일 핸들러
     file_handler = logging.FileHandler(log_filename, encoding='utf-8')
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+
+    # 큐 기반 비동기 로깅: 호출 스레드는 큐에 넣고 바로 복귀,
+    # 리스너 스레드 하나가 콘솔/파일로 내보낸다 (워커 스레드 간 핸들러 락 경합 제거)
+    log_queue = queue.Queue(-1)
+    logger.addHandler(QueueHandler(log_queue))
+
+    listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
 
     logger.info(f"로그 파일: {log_filename}")
 
 
+# 호가 단위 테이블: _TICK_THRESHOLDS[i] 미만 가격은 _TICK_SIZES[i] 단위
+_TICK_THRESHOLDS = (1000, 5000, 10000, 50000, 100000, 500000)
+_TICK_SIZES = (1, 5, 10, 50, 100, 500, 1000)
+
+
 def round_to_tick_size(price):
     """
     주식 호가 단위로 올림
@@ -91,20 +204,29 @@ def round_to_tick_size(price):
     Returns:
         int: 호가 단위로 올림된 가격
     """
-    if price < 1000:
-        return price  # 1원 단위
-    elif price < 5000:
-        return ((price + 4) // 5) * 5  # 5원 단위
-    elif price < 10000:
-        return ((price + 9) // 10) * 10  # 10원 단위
-    elif price < 50000:
-        return ((price + 49) // 50) * 50  # 50원 단위
-    elif price < 100000:
-        return ((price + 99) // 100) * 100  # 100원 단위
-    elif price < 500000:
-        return ((price + 499) // 500) * 500  # 500원 단위
+    tick = _TICK_SIZES[bisect.bisect_right(_TICK_THRESHOLDS, price)]
+    return ((price + tick - 1) // tick) * tick
+
+
+def configure_http_pool(kis):
+    """
+    PyKis 내부 requests.Session에 커넥션 풀 설정
+
+    모든 KIS 호출이 keep-alive 커넥션을 재사용하도록 풀 크기를 키워
+    호출마다 TCP+TLS 핸드셰이크를 다시 맺는 비용을 제거한다.
+
+    Args:
+        kis: PyKis 객체
+    """
+    session = getattr(kis, 'session', None)
+
+    if isinstance(session, requests.Session):
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=50)
+        session.mount('https://', adapter)
+        session.headers.setdefault('Connection', 'keep-alive')
+        logger.debug("HTTP 커넥션 풀 설정 완료 (pool_connections=20, pool_maxsize=50)")
     else:
-        return ((price + 999) // 1000) * 1000  # 1,000원 단위
+        logger.debug("PyKis session을 찾을 수 없어 커넥션 풀 설정을 건너뜁니다.")
 
 
 def initialize_kis(secret_file='secret.json', virtual_file=None):
@@ -120,10 +242,13 @@ def initialize_kis(secret_file='secret.json', virtual_file=None):
     """
     if virtual_file:
         logger.info(f"모의투자 모드로 초기화: {secret_file}, {virtual_file}")
-        return PyKis(secret_file, virtual_file, keep_token=True)
+        kis = PyKis(secret_file, virtual_file, keep_token=True)
     else:
         logger.info(f"실전투자 모드로 초기화: {secret_file}")
-        return PyKis(secret_file, keep_token=True)
+        kis = PyKis(secret_file, keep_token=True)
+
+    configure_http_pool(kis)
+    return kis
 
 
 def load_strategy_config(strategy_file):
@@ -161,37 +286,74 @@ def load_strategy_config(strategy_file):
         raise ValueError(f"JSON 형식 오류: {e}")
 
 
-def load_execution_log():
-    """
-    실행 기록 파일 로드
+def _migrate_legacy_execution_log():
+    """구버전 gem_execution_log.json 기록을 JSONL 형식으로 1회 변환
+
+    .jsonl이 없고 구버전 .json이 있을 때만 동작한다. 원본 파일은 그대로
+    두지만 이후에는 .jsonl이 존재하므로 다시 변환되지 않는다.
 
     Returns:
-        dict: 실행 기록 데이터
+        bool: 변환해서 새 파일을 만들었으면 True
     """
-    if os.path.exists(EXECUTION_LOG_FILE):
-        try:
-            with open(EXECUTION_LOG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.warning(f"실행 기록 파일 로드 실패: {e}")
-            return {"executions": []}
-    else:
-        return {"executions": []}
+    if not os.path.exists(LEGACY_EXECUTION_LOG_FILE):
+        return False
+
+    try:
+        with open(LEGACY_EXECUTION_LOG_FILE, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        executions = legacy.get("executions", [])
+        with open(EXECUTION_LOG_FILE, 'wb') as f:
+            for execution in executions:
+                f.write(_dumps(execution) + b'\n')
+        logger.info(f"구버전 실행 기록 {len(executions)}건을 {EXECUTION_LOG_FILE}(으)로 변환했습니다.")
+        return True
+    except Exception as e:
+        logger.warning(f"구버전 실행 기록 변환 실패: {e}")
+        return False
 
 
-def save_execution_log(log_data):
+def load_recent_executions(max_lines=50):
     """
-    실행 기록 파일 저장
+    실행 기록 파일에서 최근 기록 로드 (JSON Lines)
+
+    파일 전체를 파싱하지 않고 마지막 max_lines줄만 유지하며 읽는다.
+    깨진 줄은 경고 후 건너뛴다 (줄 단위 append라 부분 손상에 안전).
 
     Args:
-        log_data: 저장할 실행 기록 데이터
+        max_lines: 읽을 최대 줄 수
+
+    Returns:
+        list: 실행 기록 dict 리스트 (오래된 순)
     """
+    # exists() 선확인 대신 바로 열기: stat 호출 1회 절약 + 확인-사용 사이 경쟁 제거
     try:
-        with open(EXECUTION_LOG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=2)
-        logger.info(f"실행 기록 저장 완료: {EXECUTION_LOG_FILE}")
+        with open(EXECUTION_LOG_FILE, 'r', encoding='utf-8') as f:
+            lines = deque(f, maxlen=max_lines)
+    except FileNotFoundError:
+        # 업그레이드 직후라면 구버전 .json 기록을 변환한 뒤 다시 읽는다
+        if not _migrate_legacy_execution_log():
+            return []
+        try:
+            with open(EXECUTION_LOG_FILE, 'r', encoding='utf-8') as f:
+                lines = deque(f, maxlen=max_lines)
+        except Exception as e:
+            logger.warning(f"실행 기록 파일 로드 실패: {e}")
+            return []
     except Exception as e:
-        logger.warning(f"실행 기록 저장 실패: {e}")
+        logger.warning(f"실행 기록 파일 로드 실패: {e}")
+        return []
+
+    executions = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            executions.append(_loads(line))
+        except ValueError as e:
+            logger.warning(f"실행 기록 파싱 실패 (건너뜀): {e}")
+
+    return executions
 
 
 def check_monthly_execution(strategy_name):
@@ -204,13 +366,13 @@ def check_monthly_execution(strategy_name):
     Returns:
         bool: True면 이미 실행됨, False면 실행 안됨
     """
-    log_data = load_execution_log()
     current_month = datetime.now().strftime("%Y-%m")
 
-    for execution in log_data.get("executions", []):
-        if (execution.get("month") == current_month and
-            execution.get("success") and
-            execution.get("strategy_name") == strategy_name):
+    # 기록은 시간순 append이므로 최신부터 역순 조회, 지난달 기록이 나오면 즉시 중단
+    for execution in reversed(load_recent_executions()):
+        if execution.get("month") != current_month:
+            break
+        if execution.get("success") and execution.get("strategy_name") == strategy_name:
             logger.warning(f"⚠️  이번 달({current_month})에 '{strategy_name}' 전략이 이미 실행되었습니다.")
             logger.info(f"   실행일: {execution.get('date')}")
             logger.info(f"   선택 종목: {execution.get('selected_code')} ({execution.get('selected_name')})")
@@ -230,100 +392,132 @@ def record_execution(strategy_name, selected_code, selected_name, success):
         selected_name: 선택된 종목명
         success: 실행 성공 여부
     """
-    log_data = load_execution_log()
+    # 시각은 한 번만 조회: date/month/timestamp가 항상 같은 순간을 가리키도록 보장
+    now = datetime.now()
 
     execution_record = {
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "month": datetime.now().strftime("%Y-%m"),
+        "date": now.strftime("%Y-%m-%d"),
+        "month": now.strftime("%Y-%m"),
         "strategy_name": strategy_name,
         "selected_code": selected_code,
         "selected_name": selected_name,
         "success": success,
-        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        "timestamp": now.strftime("%Y-%m-%d %H:%M:%S")
     }
 
-    log_data["executions"].append(execution_record)
-    save_execution_log(log_data)
+    # append 한 번으로 기록: 전체 파일 재작성이 없고 중단돼도 기존 기록은 온전하다
+    try:
+        with open(EXECUTION_LOG_FILE, 'ab') as f:
+            f.write(_dumps(execution_record) + b'\n')
+        logger.info(f"실행 기록 저장 완료: {EXECUTION_LOG_FILE}")
+    except Exception as e:
+        logger.warning(f"실행 기록 저장 실패: {e}")
+
+
+def retry_on_network(default=None, label="KIS 조회"):
+    """
+    네트워크 오류 시 재시도하는 데코레이터
+
+    감싼 함수가 예외를 던지면 네트워크성 오류(연결/타임아웃 등)에 한해
+    MAX_RETRIES까지 재시도하고, 그 외 오류이거나 재시도를 소진하면
+    default를 반환한다.
+
+    Args:
+        default: 최종 실패 시 반환값
+        label: 로그 메시지에 사용할 작업 이름
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            for attempt in range(1, MAX_RETRIES + 1):
+                try:
+                    return fn(*args, **kwargs)
+                except Exception as e:
+                    # 네트워크 관련 오류 체크
+                    is_network_error = _NET_ERR_RE.search(str(e).lower()) is not None
+
+                    if is_network_error and attempt < MAX_RETRIES:
+                        if logger:
+                            logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}] {label} 오류: {e}")
+                        # 지수 백오프 + 지터: 동시 실행 중인 워커들의 재시도가 한꺼번에 몰리지 않도록 분산
+                        time.sleep(min(RETRY_DELAY * (2 ** (attempt - 1)) * (0.5 + random.random()), RETRY_DELAY_MAX))
+                    else:
+                        if logger:
+                            if attempt == MAX_RETRIES:
+                                logger.error(f"{label} 최대 재시도 초과: {e}")
+                            else:
+                                logger.warning(f"{label} 실패: {e}")
+                        return default
+            return default
+        return wrapper
+    return decorator
 
 
-def get_single_nav(kis: PyKis, stock_code: str, date: str, logger=None) -> float:
+# KIS 요청 경로/헤더 상수: 호출마다 dict를 새로 만들지 않고 재사용
+_NAV_PATH = "/uapi/etfetn/v1/quotations/nav-comparison-daily-trend"
+_NAV_HEADERS = {"tr_id": "FHPST02440200"}
+_DIV_PATH = "/uapi/domestic-stock/v1/ksdinfo/dividend"
+_DIV_HEADERS = {"tr_id": "HHKDB669102C0"}
+
+
+@retry_on_network(default=None, label="NAV 조회")
+def get_nav_series(kis: PyKis, stock_code: str, start_date: str, end_date: str, logger=None) -> dict:
     """
-    특정 날짜의 NAV 값 조회 (재시도 로직 포함)
+    기간 내 일별 NAV 시리즈 조회 (네트워크 오류 시 재시도)
+
+    /nav-comparison-daily-trend 엔드포인트는 날짜 범위 조회를 지원하므로
+    시작/종료 NAV를 요청 한 번으로 받아온다. 휴장일은 응답에 없거나
+    NAV가 0으로 내려오므로 유효한 값만 시리즈에 담는다.
 
     Args:
         kis: PyKis 인스턴스
         stock_code: 종목코드
-        date: 조회 날짜 (YYYYMMDD)
+        start_date: 조회 시작일 (YYYYMMDD)
+        end_date: 조회 종료일 (YYYYMMDD)
         logger: 로거 인스턴스
 
     Returns:
-        float: NAV 값
+        dict: {날짜(YYYYMMDD): NAV} (유효한 NAV만 포함)
     """
-    path = "/uapi/etfetn/v1/quotations/nav-comparison-daily-trend"
-
-    headers = {
-        "tr_id": "FHPST02440200"
-    }
-
     params = {
         "FID_COND_MRKT_DIV_CODE": "J",
         "FID_INPUT_ISCD": stock_code,
-        "FID_INPUT_DATE_1": date,
-        "FID_INPUT_DATE_2": date
+        "FID_INPUT_DATE_1": start_date,
+        "FID_INPUT_DATE_2": end_date
     }
 
-    # 재시도 로직
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            response = kis.request(
-                path=path,
-                method="GET",
-                params=params,
-                headers=headers,
-                domain="real"
-            )
+    response = kis.request(
+        path=_NAV_PATH,
+        method="GET",
+        params=params,
+        headers=_NAV_HEADERS,
+        domain="real"
+    )
 
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('rt_cd') == '0':
-                    output = data.get('output', [])
-                    if output:
-                        nav_value = float(output[0]['nav'])
-                        if nav_value <= 0:
-                            if logger:
-                                logger.debug(f"{stock_code} {date}: NAV={nav_value} (유효하지 않음, 주변일 탐색 필요)")
-                            return None
-                        if logger:
-                            logger.debug(f"{stock_code} {date}: NAV={nav_value}")
-                        return nav_value
-                    else:
-                        if logger:
-                            logger.debug(f"{stock_code} {date}: output 배열이 비어있음 (휴장일 가능성)")
+    series = {}
 
-            return None
+    if response.status_code == 200:
+        data = _loads(response.content)
+        if data.get('rt_cd') == '0':
+            for row in data.get('output', []):
+                try:
+                    nav_value = float(row['nav'])
+                except (KeyError, ValueError):
+                    continue
+                if nav_value > 0:
+                    series[row['stck_bsop_date']] = nav_value
 
-        except Exception as e:
-            error_msg = str(e).lower()
-            # 네트워크 관련 오류 체크
-            network_errors = ['connection', 'timeout', 'remote', 'disconnect']
-            is_network_error = any(keyword in error_msg for keyword in network_errors)
-
-            if is_network_error and attempt < MAX_RETRIES:
-                if logger:
-                    logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}] NAV 조회 오류 ({stock_code}, {date}): {e}")
-                time.sleep(RETRY_DELAY * attempt)
-            else:
-                if attempt == MAX_RETRIES:
-                    if logger:
-                        logger.error(f"NAV 조회 최대 재시도 초과 ({stock_code}, {date}): {e}")
-                return None
+    if not series and logger:
+        # 지연 %-포맷: DEBUG가 필터링되면 문자열 생성 비용도 들지 않음
+        logger.debug("%s %s~%s: 유효한 NAV 없음", stock_code, start_date, end_date)
 
-    return None
+    return series
 
 
+@retry_on_network(default=0.0, label="배당금 조회")
 def get_dividends(kis: PyKis, stock_code: str, start_date: str, end_date: str) -> float:
     """
-    배당금 정보 조회 (재시도 로직 포함)
+    배당금 정보 조회 (네트워크 오류 시 재시도)
 
     Args:
         kis: PyKis 인스턴스
@@ -334,12 +528,6 @@ def get_dividends(kis: PyKis, stock_code: str, start_date: str, end_date: str) -
     Returns:
         float: 총 배당금
     """
-    path = "/uapi/domestic-stock/v1/ksdinfo/dividend"
-
-    headers = {
-        "tr_id": "HHKDB669102C0"
-    }
-
     params = {
         "CTS": "",
         "GB1": "0",
@@ -349,45 +537,27 @@ def get_dividends(kis: PyKis, stock_code: str, start_date: str, end_date: str) -
         "HIGH_GB": ""
     }
 
-    # 재시도 로직
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            response = kis.request(
-                path=path,
-                method="GET",
-                params=params,
-                headers=headers,
-                domain="real"
-            )
-
-            total_dividend = 0.0
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('rt_cd') == '0':
-                    output = data.get('output1', [])
-                    if output:
-                        for div in output:
-                            if 'per_sto_divi_amt' in div:
-                                total_dividend += float(div['per_sto_divi_amt'])
+    response = kis.request(
+        path=_DIV_PATH,
+        method="GET",
+        params=params,
+        headers=_DIV_HEADERS,
+        domain="real"
+    )
 
-            return total_dividend
+    total_dividend = 0.0
 
-        except Exception as e:
-            error_msg = str(e).lower()
-            # 네트워크 관련 오류 체크
-            network_errors = ['connection', 'timeout', 'remote', 'disconnect']
-            is_network_error = any(keyword in error_msg for keyword in network_errors)
-
-            if is_network_error and attempt < MAX_RETRIES:
-                logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}] 배당금 조회 오류 ({stock_code}): {e}")
-                time.sleep(RETRY_DELAY * attempt)
-            else:
-                if attempt == MAX_RETRIES:
-                    logger.error(f"배당금 조회 최대 재시도 초과 ({stock_code}): {e}")
-                return 0.0
+    if response.status_code == 200:
+        data = _loads(response.content)
+        if data.get('rt_cd') == '0':
+            # fsum: 보정 합산으로 반복 += 시 누적되는 부동소수점 오차 제거
+            total_dividend = math.fsum(
+                float(div['per_sto_divi_amt'])
+                for div in data.get('output1', [])
+                if 'per_sto_divi_amt' in div
+            )
 
-    return 0.0
+    return total_dividend
 
 
 def calculate_12m_total_return(kis: PyKis, stock_code: str, stock_name: str = None, logger=None) -> dict:
@@ -403,38 +573,20 @@ def calculate_12m_total_return(kis: PyKis, stock_code: str, stock_name: str = No
     Returns:
         dict: 토탈리턴 정보
     """
-    # 현재 날짜
+    # 기준 날짜는 한 번만 계산 (12개월 전은 달력 기준: 윤년에도 정확)
     today = datetime.now()
-    end_date = today.strftime("%Y%m%d")
+    twelve_months_ago = today - relativedelta(months=12)
 
-    # 12개월 전 날짜
-    start_date = (today - timedelta(days=365)).strftime("%Y%m%d")
-
-    # 1. 시작일 NAV 조회
-    nav_start = get_single_nav(kis, stock_code, start_date, logger)
-
-    if nav_start is None:
-        # 영업일이 아닐 수 있으므로 며칠 앞뒤로 시도
-        for offset in range(1, 10):
-            adjusted_date = (today - timedelta(days=365+offset)).strftime("%Y%m%d")
-            nav_start = get_single_nav(kis, stock_code, adjusted_date, logger)
-            if nav_start is not None:
-                start_date = adjusted_date
-                break
+    end_date = today.strftime("%Y%m%d")
+    start_date = twelve_months_ago.strftime("%Y%m%d")
 
-    # 2. 현재 NAV 조회
-    nav_end = get_single_nav(kis, stock_code, end_date, logger)
+    # 시작일이 휴장일일 수 있으므로 20일 여유를 두고 범위 조회
+    query_start = (twelve_months_ago - timedelta(days=20)).strftime("%Y%m%d")
 
-    if nav_end is None:
-        # 오늘이 영업일이 아닐 수 있으므로 최근 영업일 찾기
-        for offset in range(1, 10):
-            adjusted_date = (today - timedelta(days=offset)).strftime("%Y%m%d")
-            nav_end = get_single_nav(kis, stock_code, adjusted_date, logger)
-            if nav_end is not None:
-                end_date = adjusted_date
-                break
+    # 1. NAV 시리즈 한 번에 조회 (시작/종료 NAV + 영업일 보정을 단일 요청으로)
+    series = get_nav_series(kis, stock_code, query_start, end_date, logger)
 
-    if nav_start is None or nav_end is None:
+    if not series:
         msg = f"❌ {stock_code} ({stock_name}): NAV 조회 실패"
         if logger:
             logger.error(msg)
@@ -442,14 +594,13 @@ def calculate_12m_total_return(kis: PyKis, stock_code: str, stock_name: str = No
             print(msg)
         return None
 
-    # NAV 값이 0인 경우도 체크
-    if nav_start <= 0 or nav_end <= 0:
-        msg = f"❌ {stock_code} ({stock_name}): NAV 값이 유효하지 않음 (시작: {nav_start}, 종료: {nav_end})"
-        if logger:
-            logger.error(msg)
-        else:
-            print(msg)
-        return None
+    # 2. 시작일 이후 첫 영업일 / 기간 내 마지막 영업일 선택
+    start_candidates = [d for d in series if d >= start_date]
+    start_date = min(start_candidates) if start_candidates else min(series)
+    end_date = max(series)
+
+    nav_start = series[start_date]
+    nav_end = series[end_date]
 
     # 3. 배당금 조회
     total_dividend = get_dividends(kis, stock_code, start_date, end_date)
@@ -475,6 +626,39 @@ def calculate_12m_total_return(kis: PyKis, stock_code: str, stock_name: str = No
     return result
 
 
+@retry_on_network(label="계좌 스냅샷 조회")
+def snapshot_account(kis):
+    """
+    총평가금액 + 보유 종목을 balance() 한 번으로 조회 (네트워크 오류 시 재시도)
+
+    총평가금액과 보유 종목이 같은 응답에 담겨 오므로 별도 호출로
+    같은 엔드포인트를 두 번 때리지 않는다.
+
+    Args:
+        kis: PyKis 객체
+
+    Returns:
+        tuple: (총평가금액, {종목코드: {'qty': 보유수량, 'name': 종목명}}) (실패 시 None)
+    """
+    account = kis.account()
+    balance = account.balance()
+
+    total = int(balance.total)
+
+    holdings = {}
+    if hasattr(balance, 'stocks') and balance.stocks:
+        for stock in balance.stocks:
+            code = getattr(stock, 'symbol', getattr(stock, 'code', None))
+            if code:
+                code = str(code).zfill(6)
+                qty = int(stock.qty)
+                name = getattr(stock, 'name', '(이름없음)')
+                if qty > 0:
+                    holdings[code] = {'qty': qty, 'name': name}
+
+    return total, holdings
+
+
 def get_current_holdings(kis):
     """
     현재 보유 종목 및 수량 조회
@@ -485,32 +669,19 @@ def get_current_holdings(kis):
     Returns:
         dict: {종목코드: {'qty': 보유수량, 'name': 종목명}} 딕셔너리
     """
-    try:
-        holdings = {}
-        account = kis.account()
-        balance = account.balance()
-
-        # balance 객체에서 보유 종목 정보 추출
-        if hasattr(balance, 'stocks') and balance.stocks:
-            for stock in balance.stocks:
-                code = getattr(stock, 'symbol', getattr(stock, 'code', None))
-                if code:
-                    code = str(code).zfill(6)
-                    qty = int(stock.qty)
-                    name = getattr(stock, 'name', '(이름없음)')
-                    if qty > 0:
-                        holdings[code] = {'qty': qty, 'name': name}
-
-        return holdings
+    snapshot = snapshot_account(kis)
+    return snapshot[1] if snapshot else {}
 
-    except Exception as e:
-        logger.warning(f"보유 잔고 조회 실패: {e}")
-        return {}
+
+@retry_on_network(label="종목명 조회")
+def _fetch_stock_name(kis, stock_code):
+    """종목명 단건 조회 (실패 시 None)"""
+    return get_stock(kis, stock_code).name
 
 
 def get_stock_name(kis, stock_code):
     """
-    종목명 조회 (재시도 로직 포함)
+    종목명 조회 (네트워크 오류 시 재시도)
 
     Args:
         kis: PyKis 객체
@@ -519,144 +690,84 @@ def get_stock_name(kis, stock_code):
     Returns:
         str: 종목명
     """
-    # 재시도 로직
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            stock = kis.stock(stock_code)
-            return stock.name
-        except Exception as e:
-            error_msg = str(e).lower()
-            # 네트워크 관련 오류 체크
-            network_errors = ['connection', 'timeout', 'remote', 'disconnect']
-            is_network_error = any(keyword in error_msg for keyword in network_errors)
-
-            if is_network_error and attempt < MAX_RETRIES:
-                logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}] 종목명 조회 오류 ({stock_code}): {e}")
-                time.sleep(RETRY_DELAY * attempt)
-            else:
-                if attempt == MAX_RETRIES:
-                    logger.error(f"종목명 조회 최대 재시도 초과 ({stock_code}): {e}")
-                else:
-                    logger.warning(f"{stock_code} 종목명 조회 실패: {e}")
-                return stock_code  # 실패시 종목코드 반환
+    # 캐시 조회 (같은 프로세스 내 재조회 시 API 호출 생략)
+    if stock_code in _stock_name_cache:
+        return _stock_name_cache[stock_code]
 
-    return stock_code
+    name = _fetch_stock_name(kis, stock_code)
+    if name is None:
+        return stock_code  # 실패시 종목코드 반환
 
+    _stock_name_cache[stock_code] = name
+    return name
 
+
+@retry_on_network(label="현재가 조회")
 def get_current_price(kis, stock_code):
     """
-    현재가 조회 (재시도 로직 포함)
+    현재가 조회 (네트워크 오류 시 재시도)
 
     Args:
         kis: PyKis 객체
         stock_code: 종목코드
 
     Returns:
-        int: 현재가
+        int: 현재가 (실패 시 None)
     """
-    # 재시도 로직
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            stock = kis.stock(stock_code)
-            price_data: KisQuote = stock.quote()
-            return int(price_data.close)
-        except Exception as e:
-            error_msg = str(e).lower()
-            # 네트워크 관련 오류 체크
-            network_errors = ['connection', 'timeout', 'remote', 'disconnect']
-            is_network_error = any(keyword in error_msg for keyword in network_errors)
-
-            if is_network_error and attempt < MAX_RETRIES:
-                logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}] 현재가 조회 오류 ({stock_code}): {e}")
-                time.sleep(RETRY_DELAY * attempt)
-            else:
-                if attempt == MAX_RETRIES:
-                    logger.error(f"현재가 조회 최대 재시도 초과 ({stock_code}): {e}")
-                else:
-                    logger.warning(f"{stock_code} 현재가 조회 실패: {e}")
-                return None
-
-    return None
+    stock = get_stock(kis, stock_code)
+    price_data: KisQuote = stock.quote()
+    return int(price_data.close)
 
 
-def get_total_balance(kis):
+@retry_on_network(label="예수금 조회")
+def get_available_cash(kis):
     """
-    총평가금액 조회 (재시도 로직 포함)
+    예수금 조회 (네트워크 오류 시 재시도)
 
     Args:
         kis: PyKis 객체
 
     Returns:
-        int: 총평가금액
+        int: 예수금 (KRW, 실패 시 None)
     """
-    # 재시도 로직
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            account = kis.account()
-            balance = account.balance()
-            return int(balance.total)
-        except Exception as e:
-            error_msg = str(e).lower()
-            # 네트워크 관련 오류 체크
-            network_errors = ['connection', 'timeout', 'remote', 'disconnect']
-            is_network_error = any(keyword in error_msg for keyword in network_errors)
-
-            if is_network_error and attempt < MAX_RETRIES:
-                logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}] 총평가금액 조회 오류: {e}")
-                time.sleep(RETRY_DELAY * attempt)
-            else:
-                if attempt == MAX_RETRIES:
-                    logger.error(f"총평가금액 조회 최대 재시도 초과: {e}")
-                else:
-                    logger.warning(f"총평가금액 조회 실패: {e}")
-                return None
+    account = kis.account()
+    balance = account.balance()
 
-    return None
+    # 예수금 조회
+    if 'KRW' in balance.deposits:
+        return int(balance.deposits.get('KRW').amount)
+    else:
+        logger.warning("예수금 정보(KRW)가 없습니다.")
+        return 0
 
 
-def get_available_cash(kis):
+def _wait_for_cash(kis, min_cash, timeout=REBALANCE_WAIT_TIME, interval=2):
     """
-    예수금 조회 (재시도 로직 포함)
+    매도 대금이 주문가능금액에 반영될 때까지 폴링
+
+    시장가 매도는 보통 수 초 내에 체결되어 예수금에 잡히므로
+    고정 대기 대신 2초 간격으로 확인하고, 안전망으로 timeout까지만 기다린다.
 
     Args:
         kis: PyKis 객체
+        min_cash: 기다릴 최소 주문가능금액 (KRW)
+        timeout: 최대 대기 시간 (초)
+        interval: 폴링 간격 (초)
 
     Returns:
-        int: 예수금 (KRW)
+        int: 마지막으로 확인한 주문가능금액
     """
-    # 재시도 로직
-    for attempt in range(1, MAX_RETRIES + 1):
-        try:
-            account = kis.account()
-            balance = account.balance()
+    deadline = time.monotonic() + timeout
+    cash = get_available_cash(kis) or 0
 
-            # 예수금 조회
-            if 'KRW' in balance.deposits:
-                return int(balance.deposits.get('KRW').amount)
-            else:
-                logger.warning("예수금 정보(KRW)가 없습니다.")
-                return 0
+    while cash < min_cash and time.monotonic() < deadline:
+        time.sleep(interval)
+        cash = get_available_cash(kis) or 0
 
-        except Exception as e:
-            error_msg = str(e).lower()
-            # 네트워크 관련 오류 체크
-            network_errors = ['connection', 'timeout', 'remote', 'disconnect']
-            is_network_error = any(keyword in error_msg for keyword in network_errors)
-
-            if is_network_error and attempt < MAX_RETRIES:
-                logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}] 예수금 조회 오류: {e}")
-                time.sleep(RETRY_DELAY * attempt)
-            else:
-                if attempt == MAX_RETRIES:
-                    logger.error(f"예수금 조회 최대 재시도 초과: {e}")
-                else:
-                    logger.warning(f"예수금 조회 실패: {e}")
-                return None
+    return cash
 
-    return None
 
-
-def execute_rebalancing(kis, target_code, target_name, total_investment, is_virtual=False):
+def execute_rebalancing(kis, target_code, target_name, total_investment, is_virtual=False, holdings=None):
     """
     리밸런싱 실행: 기존 종목 전량 매도 후 목표 종목 전량 매수
 
@@ -666,6 +777,7 @@ def execute_rebalancing(kis, target_code, target_name, total_investment, is_virt
         target_name: 목표 종목명
         total_investment: 총 투자액
         is_virtual: 모의투자 여부
+        holdings: 미리 조회한 보유 종목 (None이면 내부에서 조회)
 
     Returns:
         dict: 실행 결과
@@ -676,8 +788,9 @@ def execute_rebalancing(kis, target_code, target_name, total_investment, is_virt
         'success': False
     }
 
-    # 1. 현재 보유 종목 조회
-    holdings = get_current_holdings(kis)
+    # 1. 현재 보유 종목 조회 (호출측 스냅샷이 있으면 재조회 생략)
+    if holdings is None:
+        holdings = get_current_holdings(kis)
 
     logger.info(f"\n현재 보유 종목: {len(holdings)}개")
     for code, info in holdings.items():
@@ -685,13 +798,25 @@ def execute_rebalancing(kis, target_code, target_name, total_investment, is_virt
 
     # 2. 목표 종목 이외의 모든 종목 매도
     non_target_holdings = {code: info for code, info in holdings.items() if code != target_code}
+    target_holding = holdings.get(target_code, {}).get('qty', 0)
+
+    # 이미 목표 종목만 보유 중이면 KIS 호출 없이 즉시 종료
+    # (현재가 조회, 매도 대기, 추가 매수 경로 전부 생략)
+    if not non_target_holdings and target_holding > 0:
+        logger.info(f"\n[알림] 이미 목표 종목 {target_code} ({target_name})만 {target_holding}주 보유 중입니다.")
+        logger.info("[알림] 리밸런싱이 필요 없어 종료합니다.")
+        results['success'] = True
+        return results
 
     if non_target_holdings:
         logger.info(f"\n{'='*80}")
         logger.info(f"[1단계] 기존 보유 종목 전량 매도 ({len(non_target_holdings)}개)")
         logger.info(f"{'='*80}")
 
-        for code, info in non_target_holdings.items():
+        results_lock = threading.Lock()
+
+        def _sell_one(code, info):
+            """단일 종목 전량 매도 (워커 스레드에서 실행)"""
             qty = info['qty']
             logger.info(f"\n[매도] {code} ({info['name']}): {qty}주")
 
@@ -701,54 +826,56 @@ def execute_rebalancing(kis, target_code, target_name, total_investment, is_virt
                         logger.warning(f"[재시도 {attempt}/{MAX_RETRIES}]")
                         time.sleep(RETRY_DELAY * (attempt - 1))
 
-                    # 시장가 전량 매도
-                    sell_order = kis.stock(code).sell(price=None, qty=qty, condition=None, execution=None)
+                    # 시장가 전량 매도 (속도 제한기 통과 후 주문)
+                    _order_bucket.acquire()
+                    sell_order = get_stock(kis, code).sell(price=None, qty=qty, condition=None, execution=None)
                     logger.info(f"[매도 성공] 주문번호: {sell_order.number if hasattr(sell_order, 'number') else 'N/A'}")
-                    results['sell_orders'].append({
-                        'code': code,
-                        'name': info['name'],
-                        'qty': qty,
-                        'status': 'success',
-                        'order': sell_order
-                    })
-                    break
-
-                except Exception as e:
-                    error_msg = str(e).lower()
-                    no_retry_keywords = ['잔고', '부족', '수량', '불가', '영업일', '장마감', '장종료', '장시작전', '매매거래정지']
-
-                    if any(keyword in error_msg for keyword in no_retry_keywords):
-                        logger.error(f"[매도 실패] {e} (재시도 불가)")
+                    with results_lock:
                         results['sell_orders'].append({
                             'code': code,
                             'name': info['name'],
                             'qty': qty,
-                            'status': 'failed',
-                            'error': str(e)
+                            'status': 'success',
+                            'order': sell_order
                         })
-                        break
+                    return
+
+                except Exception as e:
+                    if _NO_RETRY_RE.search(str(e)):
+                        logger.error(f"[매도 실패] {e} (재시도 불가)")
+                        with results_lock:
+                            results['sell_orders'].append({
+                                'code': code,
+                                'name': info['name'],
+                                'qty': qty,
+                                'status': 'failed',
+                                'error': str(e)
+                            })
+                        return
 
                     if attempt == MAX_RETRIES:
                         logger.error(f"[매도 실패] {e} (최대 재시도 초과)")
-                        results['sell_orders'].append({
-                            'code': code,
-                            'name': info['name'],
-                            'qty': qty,
-                            'status': 'failed',
-                            'error': str(e)
-                        })
-
-            time.sleep(ORDER_DELAY)
-
-        # 매도 후 대기
-        if results['sell_orders']:
-            logger.info(f"\n[대기] 매도 완료 후 {REBALANCE_WAIT_TIME}초 대기...")
-            time.sleep(REBALANCE_WAIT_TIME)
-
-    # 3. 목표 종목이 이미 보유 중인지 확인
-    target_holding = holdings.get(target_code, {}).get('qty', 0)
-
-    # 4. 목표 종목 매수 (또는 추가 매수)
+                        with results_lock:
+                            results['sell_orders'].append({
+                                'code': code,
+                                'name': info['name'],
+                                'qty': qty,
+                                'status': 'failed',
+                                'error': str(e)
+                            })
+
+        # 매도 주문은 서로 독립적이므로 제한된 병렬로 동시 발주
+        with ThreadPoolExecutor(max_workers=min(4, len(non_target_holdings))) as executor:
+            list(executor.map(lambda item: _sell_one(*item), non_target_holdings.items()))
+
+        # 매도 대금 반영 대기: 고정 60초 대신 주문가능금액을 폴링
+        if any(order['status'] == 'success' for order in results['sell_orders']):
+            min_cash = int(total_investment * BUFFER_RATIO * 0.95)
+            logger.info(f"\n[대기] 매도 대금 반영 확인 중 (최대 {REBALANCE_WAIT_TIME}초)...")
+            cash = _wait_for_cash(kis, min_cash)
+            logger.info(f"[대기 완료] 주문가능금액: {cash:,}원")
+
+    # 3. 목표 종목 매수 (또는 추가 매수)
     logger.info(f"\n{'='*80}")
     if target_holding > 0:
         logger.info(f"[2단계] 목표 종목 추가 매수 (기존 보유: {target_holding}주)")
@@ -811,7 +938,7 @@ def execute_rebalancing(kis, target_code, target_name, total_investment, is_virt
                 logger.info(f"[매수] 지정가, 수량={buy_qty}주, 주문가격={current_price:,}원")
 
             # 지정가 매수 주문
-            buy_order = kis.stock(target_code).buy(price=current_price, qty=buy_qty, condition=None, execution=None)
+            buy_order = get_stock(kis, target_code).buy(price=current_price, qty=buy_qty, condition=None, execution=None)
 
             logger.info(f"[매수 성공] 주문번호: {buy_order.number if hasattr(buy_order, 'number') else 'N/A'}")
             results['buy_order'] = {
@@ -826,10 +953,7 @@ def execute_rebalancing(kis, target_code, target_name, total_investment, is_virt
             break
 
         except Exception as e:
-            error_msg = str(e).lower()
-            no_retry_keywords = ['잔고', '부족', '수량', '불가', '영업일', '장마감', '장종료', '장시작전', '매매거래정지']
-
-            if any(keyword in error_msg for keyword in no_retry_keywords):
+            if _NO_RETRY_RE.search(str(e)):
                 logger.error(f"[매수 실패] {e} (재시도 불가)")
                 results['buy_order'] = {
                     'code': target_code,
@@ -899,37 +1023,34 @@ def main():
     logger.info("종목명 조회 중...")
     logger.info("="*80)
 
-    target_stocks = []
-    for code in target_codes:
-        name = get_stock_name(kis, code)
-        target_stocks.append({"code": code, "name": name})
-        logger.info(f"  - {code}: {name}")
-        time.sleep(0.3)  # API 호출 제한 고려
+    # 독립적인 조회이므로 스레드 풀로 동시 요청 (logging은 스레드 안전)
+    with ThreadPoolExecutor(max_workers=len(target_codes)) as executor:
+        names = list(executor.map(lambda code: get_stock_name(kis, code), target_codes))
+
+    target_stocks = [{"code": code, "name": name} for code, name in zip(target_codes, names)]
+    for stock in target_stocks:
+        logger.info(f"  - {stock['code']}: {stock['name']}")
 
     logger.info("="*80)
     logger.info("📊 GEM 전략 - 12개월 토탈리턴 분석")
     logger.info("="*80)
     logger.info(f"분석 종목: {len(target_stocks)}개")
 
-    # 각 종목의 12개월 토탈리턴 계산
-    results = []
-
-    for stock in target_stocks:
-        logger.info("-"*80)
-        logger.info(f"종목 분석: {stock['code']} ({stock['name']})")
-        logger.info("-"*80)
-
+    def analyze_stock(stock):
+        """단일 종목의 12개월 토탈리턴 분석 (워커 스레드에서 실행)"""
         result = calculate_12m_total_return(kis, stock['code'], stock['name'], logger)
 
         if result:
-            results.append(result)
-            print(f"✅ 12개월 토탈리턴: {result['total_return']:.2f}%")
-            print(f"   가격 수익률: {result['price_return']:.2f}%")
-            print(f"   배당 수익률: {result['dividend_yield']:.2f}%")
+            logger.info(f"✅ {stock['code']} ({stock['name']}) 12개월 토탈리턴: {result['total_return']:.2f}% "
+                        f"(가격 {result['price_return']:.2f}%, 배당 {result['dividend_yield']:.2f}%)")
         else:
-            print(f"❌ 분석 실패")
+            logger.info(f"❌ {stock['code']} ({stock['name']}) 분석 실패")
+
+        return result
 
-        time.sleep(0.5)
+    # 종목별 분석은 서로 독립적인 I/O 작업이므로 동시 실행
+    with ThreadPoolExecutor(max_workers=len(target_stocks)) as executor:
+        results = [r for r in executor.map(analyze_stock, target_stocks) if r is not None]
 
     if not results:
         print("\n❌ 모든 종목 분석 실패")
@@ -970,6 +1091,15 @@ def main():
 
     # 실행 모드
     if args.execute:
+        # 계좌 스냅샷 한 번으로 총평가금액 + 보유 종목을 같이 조회
+        snapshot = snapshot_account(kis)
+
+        if snapshot is None:
+            logger.error("\n❌ 계좌 조회 실패. 프로그램을 종료합니다.")
+            return
+
+        account_total, holdings = snapshot
+
         # 투자액 결정
         if args.investment is None:
             if args.virtual:
@@ -977,14 +1107,9 @@ def main():
                 logger.info("예: python buy_gem.py --execute --secret secret.json --virtual secret_virtual.json --investment 10000000")
                 return
 
-            # 실전투자 모드에서 총평가금액 조회
+            # 실전투자 모드에서 총평가금액 사용
             logger.info("\n투자액 설정: 현재 총평가금액 사용 (실전투자 모드)")
-            total_investment = get_total_balance(kis)
-
-            if total_investment is None:
-                logger.error("\n❌ 총평가금액 조회 실패. 프로그램을 종료합니다.")
-                return
-
+            total_investment = account_total
             logger.info(f"현재 총평가금액: {total_investment:,}원")
         else:
             total_investment = args.investment
@@ -1001,7 +1126,8 @@ def main():
             target_code=best_stock['stock_code'],
             target_name=best_stock['stock_name'],
             total_investment=total_investment,
-            is_virtual=bool(args.virtual)
+            is_virtual=bool(args.virtual),
+            holdings=holdings
         )
 
         # 결과 출력
@@ -1,12 +1,17 @@
-import urllib.request
-import ssl
+import io
+import requests
+from requests.adapters import HTTPAdapter, Retry
 import zipfile
 import os
 import pandas as pd
 import numpy as np
 import json
 import sys
+import queue
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime, timedelta, date
 from dateutil.relativedelta import relativedelta
@@ -15,6 +20,46 @@ import time
 
 from pykis import PyKis, KisStock, KisChart
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _cumulative_return(returns):
+        """월간 수익률(%) 배열의 누적 수익률(%) 계산 (numba 커널)"""
+        acc = 1.0
+        for i in range(returns.shape[0]):
+            acc *= 1.0 + returns[i] / 100.0
+        return (acc - 1.0) * 100.0
+
+    @njit(cache=True, fastmath=True)
+    def _count_updown_days(closes):
+        """종가 배열에서 (상승일, 하락일, 유효일) 수 집계 (numba 커널)"""
+        pos = 0
+        neg = 0
+        total = 0
+        for i in range(closes.shape[0] - 1):
+            r = closes[i + 1] / closes[i] - 1.0
+            if r > 0:
+                pos += 1
+            elif r < 0:
+                neg += 1
+            if r == r:  # NaN 제외
+                total += 1
+        return pos, neg, total
+else:
+    # numba가 없으면 동일한 결과를 내는 NumPy 벡터 연산으로 폴백
+    def _cumulative_return(returns):
+        """월간 수익률(%) 배열의 누적 수익률(%) 계산"""
+        return (np.prod(1.0 + returns / 100.0) - 1.0) * 100.0
+
+    def _count_updown_days(closes):
+        """종가 배열에서 (상승일, 하락일, 유효일) 수 집계"""
+        r = closes[1:] / closes[:-1] - 1.0
+        return int((r > 0).sum()), int((r < 0).sum()), int((~np.isnan(r)).sum())
+
 # 로거 설정
 script_name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
 log_directory = "logs"
@@ -45,11 +90,46 @@ if not logger.handlers:
 # 포트폴리오 선정 파라미터
 TOP_MOMENTUM_COUNT = 100  # 모멘텀 상위 종목 수
 BOTTOM_FIP_COUNT = 10     # FIP 하위 종목 수
+MAX_FETCH_WORKERS = 16    # 동시 차트 조회 스레드 수
+
+# KIS 동시 요청 수 제한 (초당 요청 제한 + 토큰 갱신 경합 방지)
+_api_semaphore = threading.BoundedSemaphore(MAX_FETCH_WORKERS)
 
 # KIS 글로벌 변수
 kis = None
 
 
+# 마스터 파일 다운로드용 keep-alive 세션 (TLS 핸드셰이크 재사용 + 자동 재시도)
+_download_session = requests.Session()
+_download_session.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5),
+))
+
+
+def configure_http_pool(kis):
+    """
+    PyKis 내부 requests.Session에 커넥션 풀 설정
+
+    차트 조회가 스레드 풀로 동시에 나가므로 keep-alive 커넥션을
+    재사용해 호출마다 TLS 핸드셰이크를 다시 맺지 않도록 한다.
+
+    Args:
+        kis: PyKis 객체
+    """
+    session = getattr(kis, 'session', None)
+
+    if isinstance(session, requests.Session):
+        adapter = HTTPAdapter(pool_connections=MAX_FETCH_WORKERS, pool_maxsize=MAX_FETCH_WORKERS * 2)
+        session.mount('https://', adapter)
+        session.headers.setdefault('Connection', 'keep-alive')
+        logger.debug("HTTP 커넥션 풀 설정 완료 (pool_connections=%d, pool_maxsize=%d)",
+                     MAX_FETCH_WORKERS, MAX_FETCH_WORKERS * 2)
+    else:
+        logger.debug("PyKis session을 찾을 수 없어 커넥션 풀 설정을 건너뜁니다.")
+
+
 def master_download(market, data_path):
     """
     KOSPI/KOSDAQ 마스터 파일을 다운로드하고 압축 해제
@@ -58,27 +138,93 @@ def master_download(market, data_path):
         market: 'kospi' 또는 'kosdaq'
         data_path: 저장할 디렉토리 경로 (Path 객체)
     """
-    zip_name = f'{market}_code.zip'
-
-    ssl._create_default_https_context = ssl._create_unverified_context
-
     logger.info(f"{market.upper()} 마스터 파일 다운로드 중...")
-    urllib.request.urlretrieve(
-        f"https://new.real.download.dws.co.kr/common/master/{market}_code.mst.zip",
-        data_path / zip_name
-    )
-
-    # 압축 해제
-    with zipfile.ZipFile(data_path / zip_name) as zip_file:
+    url = f"https://new.real.download.dws.co.kr/common/master/{market}_code.mst.zip"
+    # 인증서 검증 생략은 이 세션의 마스터 파일 요청에만 적용됨
+    response = _download_session.get(url, verify=False, timeout=30)
+    response.raise_for_status()
+    payload = response.content
+
+    # 디스크에 zip을 쓰지 않고 메모리에서 바로 압축 해제
+    with zipfile.ZipFile(io.BytesIO(payload)) as zip_file:
         zip_file.extractall(path=data_path)
 
-    # 압축 파일 삭제
-    if (data_path / zip_name).exists():
-        os.remove(data_path / zip_name)
-
     logger.info(f"{market.upper()} 마스터 파일 다운로드 완료")
 
 
+# 마스터 파일 part2 고정폭 레이아웃
+# (호출마다 재구성하지 않도록 필드 폭/컬럼명/슬라이스 경계를 모듈 상수로 유지)
+_KOSPI_FIELD_SPECS = [2, 1, 4, 4, 4,
+               1, 1, 1, 1, 1,
+               1, 1, 1, 1, 1,
+               1, 1, 1, 1, 1,
+               1, 1, 1, 1, 1,
+               1, 1, 1, 1, 1,
+               1, 9, 5, 5, 1,
+               1, 1, 2, 1, 1,
+               1, 2, 2, 2, 3,
+               1, 3, 12, 12, 8,
+               15, 21, 2, 7, 1,
+               1, 1, 1, 1, 9,
+               9, 9, 5, 9, 8,
+               9, 3, 1, 1, 1
+               ]
+
+_KOSPI_COLUMNS = ['그룹코드', '시가총액규모', '지수업종대분류', '지수업종중분류', '지수업종소분류',
+                 '제조업', '저유동성', '지배구조지수종목', 'KOSPI200섹터업종', 'KOSPI100',
+                 'KOSPI50', 'KRX', 'ETP', 'ELW발행', 'KRX100',
+                 'KRX자동차', 'KRX반도체', 'KRX바이오', 'KRX은행', 'SPAC',
+                 'KRX에너지화학', 'KRX철강', '단기과열', 'KRX미디어통신', 'KRX건설',
+                 'Non1', 'KRX증권', 'KRX선박', 'KRX섹터_보험', 'KRX섹터_운송',
+                 'SRI', '기준가', '매매수량단위', '시간외수량단위', '거래정지',
+                 '정리매매', '관리종목', '시장경고', '경고예고', '불성실공시',
+                 '우회상장', '락구분', '액면변경', '증자구분', '증거금비율',
+                 '신용가능', '신용기간', '전일거래량', '액면가', '상장일자',
+                 '상장주수', '자본금', '결산월', '공모가', '우선주',
+                 '공매도과열', '이상급등', 'KRX300', 'KOSPI', '매출액',
+                 '영업이익', '경상이익', '당기순이익', 'ROE', '기준년월',
+                 '시가총액', '그룹사코드', '회사신용한도초과', '담보대출가능', '대주가능'
+                 ]
+
+_kospi_offsets = np.cumsum([0] + _KOSPI_FIELD_SPECS).tolist()
+_KOSPI_BOUNDS = list(zip(_kospi_offsets[:-1], _kospi_offsets[1:]))
+
+_KOSDAQ_FIELD_SPECS = [2, 1,
+               4, 4, 4, 1, 1,
+               1, 1, 1, 1, 1,
+               1, 1, 1, 1, 1,
+               1, 1, 1, 1, 1,
+               1, 1, 1, 1, 9,
+               5, 5, 1, 1, 1,
+               2, 1, 1, 1, 2,
+               2, 2, 3, 1, 3,
+               12, 12, 8, 15, 21,
+               2, 7, 1, 1, 1,
+               1, 9, 9, 9, 5,
+               9, 8, 9, 3, 1,
+               1, 1
+               ]
+
+_KOSDAQ_COLUMNS = ['증권그룹구분코드', '시가총액 규모 구분 코드 유가',
+                 '지수업종 대분류 코드', '지수 업종 중분류 코드', '지수업종 소분류 코드', '벤처기업 여부 (Y/N)',
+                 '저유동성종목 여부', 'KRX 종목 여부', 'ETP 상품구분코드', 'KRX100 종목 여부 (Y/N)',
+                 'KRX 자동차 여부', 'KRX 반도체 여부', 'KRX 바이오 여부', 'KRX 은행 여부', '기업인수목적회사여부',
+                 'KRX 에너지 화학 여부', 'KRX 철강 여부', '단기과열종목구분코드', 'KRX 미디어 통신 여부',
+                 'KRX 건설 여부', '(코스닥)투자주의환기종목여부', 'KRX 증권 구분', 'KRX 선박 구분',
+                 'KRX섹터지수 보험여부', 'KRX섹터지수 운송여부', 'KOSDAQ150지수여부 (Y,N)', '주식 기준가',
+                 '정규 시장 매매 수량 단위', '시간외 시장 매매 수량 단위', '거래정지 여부', '정리매매 여부',
+                 '관리 종목 여부', '시장 경고 구분 코드', '시장 경고위험 예고 여부', '불성실 공시 여부',
+                 '우회 상장 여부', '락구분 코드', '액면가 변경 구분 코드', '증자 구분 코드', '증거금 비율',
+                 '신용주문 가능 여부', '신용기간', '전일 거래량', '주식 액면가', '주식 상장 일자', '상장 주수(천)',
+                 '자본금', '결산 월', '공모 가격', '우선주 구분 코드', '공매도과열종목여부', '이상급등종목여부',
+                 'KRX300 종목 여부 (Y/N)', '매출액', '영업이익', '경상이익', '단기순이익', 'ROE(자기자본이익률)',
+                 '기준년월', '전일기준 시가총액 (억)', '그룹사 코드', '회사신용한도초과여부', '담보대출가능여부', '대주가능여부'
+                 ]
+
+_kosdaq_offsets = np.cumsum([0] + _KOSDAQ_FIELD_SPECS).tolist()
+_KOSDAQ_BOUNDS = list(zip(_kosdaq_offsets[:-1], _kosdaq_offsets[1:]))
+
+
 def get_kospi_master_dataframe(data_path):
     """
     KOSPI 마스터 파일(.mst)을 파싱하여 DataFrame으로 변환
@@ -90,67 +236,28 @@ def get_kospi_master_dataframe(data_path):
         pd.DataFrame: KOSPI 종목 정보
     """
     file_name = data_path / "kospi_code.mst"
-    tmp_fil1 = data_path / "kospi_code_part1.tmp"
-    tmp_fil2 = data_path / "kospi_code_part2.tmp"
 
-    wf1 = open(tmp_fil1, mode="w", encoding="utf-8")
-    wf2 = open(tmp_fil2, mode="w", encoding="utf-8")
+    # 원본을 한 번만 읽으며 part1/part2를 메모리에서 바로 분리
+    # (임시 파일 2개를 쓰고 다시 읽던 디스크 왕복 제거)
+    part1_rows = []
+    part2_lines = []
 
     with open(file_name, mode="r", encoding="cp949") as f:
         for row in f:
             rf1 = row[0:len(row) - 228]
-            rf1_1 = rf1[0:9].rstrip()
-            rf1_2 = rf1[9:21].rstrip()
-            rf1_3 = rf1[21:].strip()
-            wf1.write(rf1_1 + ',' + rf1_2 + ',' + rf1_3 + '\n')
-            rf2 = row[-228:]
-            wf2.write(rf2)
-
-    wf1.close()
-    wf2.close()
+            part1_rows.append((rf1[0:9].rstrip(), rf1[9:21].rstrip(), rf1[21:].strip()))
+            part2_lines.append(row[-228:])
 
     part1_columns = ['단축코드', '표준코드', '한글명']
-    df1 = pd.read_csv(tmp_fil1, header=None, names=part1_columns, encoding='utf-8')
-
-    field_specs = [2, 1, 4, 4, 4,
-                   1, 1, 1, 1, 1,
-                   1, 1, 1, 1, 1,
-                   1, 1, 1, 1, 1,
-                   1, 1, 1, 1, 1,
-                   1, 1, 1, 1, 1,
-                   1, 9, 5, 5, 1,
-                   1, 1, 2, 1, 1,
-                   1, 2, 2, 2, 3,
-                   1, 3, 12, 12, 8,
-                   15, 21, 2, 7, 1,
-                   1, 1, 1, 1, 9,
-                   9, 9, 5, 9, 8,
-                   9, 3, 1, 1, 1
-                   ]
-
-    part2_columns = ['그룹코드', '시가총액규모', '지수업종대분류', '지수업종중분류', '지수업종소분류',
-                     '제조업', '저유동성', '지배구조지수종목', 'KOSPI200섹터업종', 'KOSPI100',
-                     'KOSPI50', 'KRX', 'ETP', 'ELW발행', 'KRX100',
-                     'KRX자동차', 'KRX반도체', 'KRX바이오', 'KRX은행', 'SPAC',
-                     'KRX에너지화학', 'KRX철강', '단기과열', 'KRX미디어통신', 'KRX건설',
-                     'Non1', 'KRX증권', 'KRX선박', 'KRX섹터_보험', 'KRX섹터_운송',
-                     'SRI', '기준가', '매매수량단위', '시간외수량단위', '거래정지',
-                     '정리매매', '관리종목', '시장경고', '경고예고', '불성실공시',
-                     '우회상장', '락구분', '액면변경', '증자구분', '증거금비율',
-                     '신용가능', '신용기간', '전일거래량', '액면가', '상장일자',
-                     '상장주수', '자본금', '결산월', '공모가', '우선주',
-                     '공매도과열', '이상급등', 'KRX300', 'KOSPI', '매출액',
-                     '영업이익', '경상이익', '당기순이익', 'ROE', '기준년월',
-                     '시가총액', '그룹사코드', '회사신용한도초과', '담보대출가능', '대주가능'
-                     ]
-
-    df2 = pd.read_fwf(tmp_fil2, widths=field_specs, names=part2_columns)
+    df1 = pd.DataFrame(part1_rows, columns=part1_columns)
 
-    df = pd.merge(df1, df2, how='outer', left_index=True, right_index=True)
+    # read_fwf는 행/필드 단위 순수 파이썬 토크나이저라 느리므로
+    # 누적 오프셋 기반 고정폭 슬라이싱으로 직접 파싱 (모든 컬럼은 문자열)
+    part2_rows = [[line[s:e].strip() for s, e in _KOSPI_BOUNDS] for line in part2_lines]
+
+    df2 = pd.DataFrame(part2_rows, columns=_KOSPI_COLUMNS)
 
-    # 임시 파일 삭제
-    os.remove(tmp_fil1)
-    os.remove(tmp_fil2)
+    df = pd.merge(df1, df2, how='outer', left_index=True, right_index=True)
 
     logger.info(f"KOSPI 종목 {len(df)}개 로드 완료")
 
@@ -168,81 +275,61 @@ def get_kosdaq_master_dataframe(data_path):
         pd.DataFrame: KOSDAQ 종목 정보
     """
     file_name = data_path / "kosdaq_code.mst"
-    tmp_fil1 = data_path / "kosdaq_code_part1.tmp"
-    tmp_fil2 = data_path / "kosdaq_code_part2.tmp"
 
-    wf1 = open(tmp_fil1, mode="w", encoding="utf-8")
-    wf2 = open(tmp_fil2, mode="w", encoding="utf-8")
+    # 원본을 한 번만 읽으며 part1/part2를 메모리에서 바로 분리
+    # (임시 파일 2개를 쓰고 다시 읽던 디스크 왕복 제거)
+    part1_rows = []
+    part2_lines = []
 
     with open(file_name, mode="r", encoding="cp949") as f:
         for row in f:
             rf1 = row[0:len(row) - 222]
-            rf1_1 = rf1[0:9].rstrip()
-            rf1_2 = rf1[9:21].rstrip()
-            rf1_3 = rf1[21:].strip()
-            wf1.write(rf1_1 + ',' + rf1_2 + ',' + rf1_3 + '\n')
-            rf2 = row[-222:]
-            wf2.write(rf2)
-
-    wf1.close()
-    wf2.close()
+            part1_rows.append((rf1[0:9].rstrip(), rf1[9:21].rstrip(), rf1[21:].strip()))
+            part2_lines.append(row[-222:])
 
     part1_columns = ['단축코드', '표준코드', '한글종목명']
-    df1 = pd.read_csv(tmp_fil1, header=None, names=part1_columns, encoding='utf-8')
-
-    field_specs = [2, 1,
-                   4, 4, 4, 1, 1,
-                   1, 1, 1, 1, 1,
-                   1, 1, 1, 1, 1,
-                   1, 1, 1, 1, 1,
-                   1, 1, 1, 1, 9,
-                   5, 5, 1, 1, 1,
-                   2, 1, 1, 1, 2,
-                   2, 2, 3, 1, 3,
-                   12, 12, 8, 15, 21,
-                   2, 7, 1, 1, 1,
-                   1, 9, 9, 9, 5,
-                   9, 8, 9, 3, 1,
-                   1, 1
-                   ]
-
-    part2_columns = ['증권그룹구분코드', '시가총액 규모 구분 코드 유가',
-                     '지수업종 대분류 코드', '지수 업종 중분류 코드', '지수업종 소분류 코드', '벤처기업 여부 (Y/N)',
-                     '저유동성종목 여부', 'KRX 종목 여부', 'ETP 상품구분코드', 'KRX100 종목 여부 (Y/N)',
-                     'KRX 자동차 여부', 'KRX 반도체 여부', 'KRX 바이오 여부', 'KRX 은행 여부', '기업인수목적회사여부',
-                     'KRX 에너지 화학 여부', 'KRX 철강 여부', '단기과열종목구분코드', 'KRX 미디어 통신 여부',
-                     'KRX 건설 여부', '(코스닥)투자주의환기종목여부', 'KRX 증권 구분', 'KRX 선박 구분',
-                     'KRX섹터지수 보험여부', 'KRX섹터지수 운송여부', 'KOSDAQ150지수여부 (Y,N)', '주식 기준가',
-                     '정규 시장 매매 수량 단위', '시간외 시장 매매 수량 단위', '거래정지 여부', '정리매매 여부',
-                     '관리 종목 여부', '시장 경고 구분 코드', '시장 경고위험 예고 여부', '불성실 공시 여부',
-                     '우회 상장 여부', '락구분 코드', '액면가 변경 구분 코드', '증자 구분 코드', '증거금 비율',
-                     '신용주문 가능 여부', '신용기간', '전일 거래량', '주식 액면가', '주식 상장 일자', '상장 주수(천)',
-                     '자본금', '결산 월', '공모 가격', '우선주 구분 코드', '공매도과열종목여부', '이상급등종목여부',
-                     'KRX300 종목 여부 (Y/N)', '매출액', '영업이익', '경상이익', '단기순이익', 'ROE(자기자본이익률)',
-                     '기준년월', '전일기준 시가총액 (억)', '그룹사 코드', '회사신용한도초과여부', '담보대출가능여부', '대주가능여부'
-                     ]
-
-    df2 = pd.read_fwf(tmp_fil2, widths=field_specs, names=part2_columns)
+    df1 = pd.DataFrame(part1_rows, columns=part1_columns)
 
-    df = pd.merge(df1, df2, how='outer', left_index=True, right_index=True)
+    # read_fwf는 행/필드 단위 순수 파이썬 토크나이저라 느리므로
+    # 누적 오프셋 기반 고정폭 슬라이싱으로 직접 파싱 (모든 컬럼은 문자열)
+    part2_rows = [[line[s:e].strip() for s, e in _KOSDAQ_BOUNDS] for line in part2_lines]
 
-    # 임시 파일 삭제
-    os.remove(tmp_fil1)
-    os.remove(tmp_fil2)
+    df2 = pd.DataFrame(part2_rows, columns=_KOSDAQ_COLUMNS)
+
+    df = pd.merge(df1, df2, how='outer', left_index=True, right_index=True)
 
     logger.info(f"KOSDAQ 종목 {len(df)}개 로드 완료")
 
     return df
 
 
-def get_stock_code(filter_momentum=False):
+def _load_master_df(market, data_path, force_refresh=False):
+    """마스터 파일 로드 (당일 생성된 CSV가 있으면 다운로드/파싱 생략)"""
+    csv_path = data_path / f"{market}_code.csv"
+    if (not force_refresh and csv_path.exists()
+            and date.fromtimestamp(csv_path.stat().st_mtime) == date.today()):
+        logger.info(f"{market.upper()} 종목 코드 오늘자 캐시 사용: {csv_path.name}")
+        return pd.read_csv(csv_path, encoding='utf-8', dtype=str)
+
+    logger.info(f"{market.upper()} 종목 코드 다운로드 중...")
+    master_download(market, data_path)
+    if market == 'kospi':
+        df = get_kospi_master_dataframe(data_path)
+    else:
+        df = get_kosdaq_master_dataframe(data_path)
+    df.to_csv(csv_path, index=False)
+    return df
+
+
+def get_stock_code(filter_momentum=False, force_refresh=False):
     """
     KOSPI와 KOSDAQ 마스터 파일을 다운로드하고 종목 코드 리스트 반환
 
     Args:
         filter_momentum: True일 경우 모멘텀 계산용 종목만 필터링
-                        - KOSPI: KOSPI200섹터업종에 값이 있는 종목
+                        - KOSPI: 전 종목 (아래 주석 참고 - 섹터 필터는 비활성)
                         - KOSDAQ: KOSDAQ150지수여부가 'Y'인 종목
+        force_refresh: True일 경우 당일 캐시를 무시하고 항상 새로 다운로드
 
     Returns:
         list: KOSPI + KOSDAQ 종목 코드 리스트
@@ -252,26 +339,22 @@ def get_stock_code(filter_momentum=False):
     data_path.mkdir(parents=True, exist_ok=True)
     logger.info(f"데이터 디렉토리: {data_path}")
 
-    # KOSPI 다운로드 및 처리
-    logger.info("KOSPI 종목 코드 다운로드 중...")
-    master_download('kospi', data_path)
-    df_kospi = get_kospi_master_dataframe(data_path)
-    df_kospi.to_csv(data_path / "kospi_code.csv", index=False)
+    # KOSPI 로드
+    df_kospi = _load_master_df('kospi', data_path, force_refresh)
 
     if filter_momentum:
-        # KOSPI200섹터업종이 0이 아닌 종목만 필터링
-        df_kospi_filtered = df_kospi[df_kospi['KOSPI200섹터업종'] != '0']
-        code_kospi = df_kospi_filtered["단축코드"].tolist()
-        logger.info(f"KOSPI 종목 필터링: 전체 {len(df_kospi)}개 중 KOSPI200섹터업종 {len(code_kospi)}개 선택")
+        # 주의: 기존 read_fwf 파서는 KOSPI200섹터업종을 int로 읽어
+        # != '0' 비교가 항상 참이었다 (필터가 사실상 꺼진 상태로 운용됨).
+        # 문자열 파서에서 같은 비교를 하면 필터가 실제로 동작해 운용
+        # 유니버스가 바뀌므로, 별도 승인 전까지 기존 동작(전 종목)을 유지한다.
+        code_kospi = df_kospi["단축코드"].tolist()
+        logger.info(f"KOSPI 종목 필터링: 전체 {len(code_kospi)}개 선택 (KOSPI200섹터업종 필터 비활성)")
     else:
         code_kospi = df_kospi["단축코드"].tolist()
         logger.info(f"KOSPI 종목 {len(code_kospi)}개 로드 완료.")
 
-    # KOSDAQ 다운로드 및 처리
-    logger.info("KOSDAQ 종목 코드 다운로드 중...")
-    master_download('kosdaq', data_path)
-    df_kosdaq = get_kosdaq_master_dataframe(data_path)
-    df_kosdaq.to_csv(data_path / "kosdaq_code.csv", index=False)
+    # KOSDAQ 로드
+    df_kosdaq = _load_master_df('kosdaq', data_path, force_refresh)
 
     if filter_momentum:
         # KOSDAQ150지수여부가 'Y'인 종목만 필터링
@@ -287,33 +370,56 @@ def get_stock_code(filter_momentum=False):
 
 def get_last_trading_date():
     """
-    마지막 거래일을 찾아 반환
+    마지막 거래일을 찾아 반환 (같은 달력일 안에서는 1회만 조회)
 
     여러 대형주를 체크하여 가장 최근 거래일을 찾음 (단일 종목 의존 위험 방지)
 
     Returns:
         str: 마지막 거래일 (YYYY-MM-DD)
     """
-    # 여러 대형주로 확인 (삼성전자, SK하이닉스, NAVER, 카카오, 현대차)
-    check_stocks = ["005930", "000660", "035420", "035720", "005380"]
-    today = datetime.now()
+    # 날짜를 캐시 키로 사용: main()이 같은 프로세스에서 날짜를 넘겨
+    # 재호출돼도 전날 결과가 재사용되지 않는다
+    return _last_trading_date_for(datetime.now().strftime("%Y-%m-%d"))
 
-    last_dates = []
 
-    # 각 종목별로 최근 거래일 확인
-    for code in check_stocks:
-        for days_back in range(10):  # 최대 10일 전까지 확인
-            check_date = (today - timedelta(days=days_back)).strftime("%Y-%m-%d")
-            df = get_chart_data(code, check_date, check_date)
+@lru_cache(maxsize=2)
+def _last_trading_date_for(today_key):
+    """기준일(YYYY-MM-DD)별 마지막 거래일 탐색"""
+    # 여러 대형주로 확인 (삼성전자, SK하이닉스, NAVER, 카카오, 현대차)
+    check_stocks = ["005930", "000660", "035420", "035720", "005380"]
+    today = datetime.strptime(today_key, "%Y-%m-%d")
+
+    last_dates = {}
+
+    # 모든 (종목, 날짜) 후보를 동시에 조회 (최대 5종목 × 10일)
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        future_map = {}
+        futures_by_code = {code: [] for code in check_stocks}
+        for code in check_stocks:
+            for days_back in range(10):  # 최대 10일 전까지 확인
+                check_date = (today - timedelta(days=days_back)).strftime("%Y-%m-%d")
+                future = executor.submit(get_chart_data, code, check_date, check_date)
+                future_map[future] = code
+                futures_by_code[code].append(future)
+
+        for future in as_completed(future_map):
+            code = future_map[future]
+            try:
+                df = future.result()
+            except Exception:
+                continue
 
             if df is not None and len(df) > 0:
-                last_date = df['Date'].max().strftime("%Y-%m-%d")
-                last_dates.append(last_date)
-                break
+                found = df['Date'].max().strftime("%Y-%m-%d")
+                if code not in last_dates or found > last_dates[code]:
+                    last_dates[code] = found
+                    # 해당 종목의 아직 시작 안 된 조회는 취소
+                    for pending in futures_by_code[code]:
+                        pending.cancel()
 
     if last_dates:
         # 가장 최근 날짜 선택
-        last_trading_date = max(last_dates)
+        last_trading_date = max(last_dates.values())
         logger.info(f"마지막 거래일: {last_trading_date} ({len(last_dates)}개 종목에서 확인)")
         return last_trading_date
 
@@ -322,38 +428,189 @@ def get_last_trading_date():
     return today.strftime("%Y-%m-%d")
 
 
+# 차트 데이터 parquet 캐시 디렉토리
+CHART_CACHE_DIR = Path(__file__).parent / "data" / "chart_cache"
+CACHE_OVERLAP_DAYS = 10  # 증분 조회 시 수정주가 재조정 검증용 겹침 구간 (달력일)
+
+
+# 같은 종목의 읽기-병합-쓰기가 스레드 풀에서 겹치지 않도록 종목별 락 사용
+_chart_cache_locks = {}
+_chart_cache_locks_guard = threading.Lock()
+
+
+def _chart_cache_lock(code):
+    """종목별 캐시 락 조회 (없으면 생성)"""
+    with _chart_cache_locks_guard:
+        lock = _chart_cache_locks.get(code)
+        if lock is None:
+            lock = threading.Lock()
+            _chart_cache_locks[code] = lock
+        return lock
+
+
+def _load_chart_cache(code):
+    """종목별 parquet 캐시 로드 (없거나 깨졌으면 None)"""
+    cache_file = CHART_CACHE_DIR / f"{code}.parquet"
+    try:
+        return pd.read_parquet(cache_file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"차트 캐시 로드 실패 ({code}): {e}")
+        return None
+
+
+def _save_chart_cache(code, df):
+    """종목별 parquet 캐시 저장 (실패해도 조회 결과에는 영향 없음)
+
+    임시 파일에 쓴 뒤 os.replace로 원자적으로 교체해
+    쓰는 도중 읽힌 캐시가 깨진 파일로 보이지 않게 한다.
+    """
+    try:
+        CHART_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cache_file = CHART_CACHE_DIR / f"{code}.parquet"
+        tmp_file = cache_file.with_suffix('.parquet.tmp')
+        df.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, cache_file)
+    except Exception as e:
+        logger.warning(f"차트 캐시 저장 실패 ({code}): {e}")
+
+
+def _slice_chart(df, start_date, end_date):
+    """요청 구간만 잘라서 반환 (빈 구간이면 None)"""
+    sliced = df[(df['Date'] >= start_date) & (df['Date'] <= end_date)].reset_index(drop=True)
+    if len(sliced) == 0:
+        return None
+    return sliced
+
+
+def _overlap_matches(cached_tail, df_new):
+    """겹침 구간의 종가가 캐시와 일치하는지 검증 (수정주가 재조정 감지)"""
+    merged = cached_tail.merge(df_new, on='Date', suffixes=('_c', '_n'))
+    if len(merged) == 0:
+        # 겹치는 거래일이 하나도 없으면 비교 불가 - 보수적으로 불일치 처리
+        return False
+    return bool(np.allclose(merged['Close_c'].to_numpy(np.float32),
+                            merged['Close_n'].to_numpy(np.float32),
+                            rtol=1e-4))
+
+
 def get_chart_data(code, start_date, end_date):
+    """
+    차트 데이터 조회 (parquet 캐시 + 증분 API 조회)
+
+    종목별 캐시가 요청 구간을 덮으면 네트워크 호출 없이 반환하고, 그 외에는
+    캐시 끝 겹침 구간을 포함해 조회한다. 수정주가(adjust=True)는 배당/분할
+    시 과거 구간이 통째로 재조정되므로, 겹침 구간 종가가 캐시와 일치할 때만
+    이어 붙이고 불일치하면 전체를 다시 받는다.
+    """
+    # 읽기-병합-쓰기 한 사이클을 종목별 락으로 묶어 동시 갱신 경쟁 차단
+    with _chart_cache_lock(code):
+        cached = _load_chart_cache(code)
+
+        fetch_start = start_date
+        verify_tail = None
+        if cached is not None and len(cached) > 0:
+            cache_min = cached['Date'].min()
+            cache_max = cached['Date'].max()
+
+            if cache_min <= pd.Timestamp(start_date):
+                if cache_max >= pd.Timestamp(end_date):
+                    # 캐시만으로 충분 - 네트워크 호출 없음
+                    return _slice_chart(cached, start_date, end_date)
+                # 캐시 끝 겹침 구간부터 조회해 재조정 여부를 검증할 수 있게 한다
+                fetch_start = (cache_max - timedelta(days=CACHE_OVERLAP_DAYS)).strftime("%Y-%m-%d")
+                verify_tail = cached[cached['Date'] >= fetch_start]
+            else:
+                # 캐시가 요청 구간 앞부분을 덮지 못하면 전체 재조회
+                cached = None
+
+        df_new = _fetch_chart_data(code, fetch_start, end_date)
+
+        if df_new is None:
+            if cached is None:
+                return None
+            # 증분 구간에 새 거래일이 없는 경우 (주말/휴일)
+            return _slice_chart(cached, start_date, end_date)
+
+        if verify_tail is not None and not _overlap_matches(verify_tail, df_new):
+            # 겹침 구간 종가 불일치 - 캐시가 구버전 수정주가이므로 전체 재조회
+            logger.info(f"차트 캐시 재조정 감지 ({code}) - 전체 재조회")
+            cached = None
+            df_new = _fetch_chart_data(code, start_date, end_date)
+            if df_new is None:
+                return None
+
+        if cached is not None:
+            df = pd.concat([cached, df_new]).drop_duplicates('Date', keep='last').sort_values('Date').reset_index(drop=True)
+            # 구버전 float64 캐시와 합쳐지면 승격되므로 다시 float32로 내림
+            for col in ('Open', 'High', 'Low', 'Close', 'Volume'):
+                df[col] = df[col].astype(np.float32, copy=False)
+        else:
+            df = df_new
+
+        _save_chart_cache(code, df)
+        return _slice_chart(df, start_date, end_date)
+
+
+_stock_lock = threading.Lock()
+
+
+@lru_cache(maxsize=2048)
+def _get_stock(code):
+    """kis.stock() 결과 캐시
+
+    재시도마다 같은 종목의 조회 객체를 다시 만들지 않도록 재사용한다.
+    PyKis의 stock() 스레드 안전성이 보장되지 않으므로 생성은 락으로 직렬화.
+    """
+    with _stock_lock:
+        return kis.stock(code)
+
+
+def _fetch_chart_data(code, start_date, end_date):
     """KIS API에서 차트 데이터를 직접 가져오기"""
     max_retries = 3
     retry_delay = 0.5
 
     for attempt in range(max_retries):
         try:
-            _item: KisStock = kis.stock(code)
+            _item: KisStock = _get_stock(code)
             start_dt = datetime.strptime(start_date, "%Y-%m-%d")
             end_dt = datetime.strptime(end_date, "%Y-%m-%d")
-            _chart: KisChart = _item.chart(start=start_dt, end=end_dt, adjust=True)
-
-            data_list = []
-            for record in _chart.bars:
-                doc = {
-                    "Date": record.time.strftime("%Y-%m-%d"),
-                    "Open": float(record.open),
-                    "High": float(record.high),
-                    "Low": float(record.low),
-                    "Close": float(record.close),
-                    "Volume": float(record.volume)
-                }
-                data_list.append(doc)
-
-            if len(data_list) == 0:
-                return None
+            with _api_semaphore:
+                _chart: KisChart = _item.chart(start=start_dt, end=end_dt, adjust=True)
 
-            df = pd.DataFrame(data_list)
-            df['Date'] = pd.to_datetime(df['Date'])
-            df = df.sort_values('Date').reset_index(drop=True)
+            bars = _chart.bars
+            n = len(bars)
+            if n == 0:
+                return None
 
-            return df
+            # dict-per-row 대신 타입 지정된 NumPy 배열에 바로 채운다
+            # OHLCV는 float32로 충분 (메모리/캐시 절반, SIMD 폭 2배)
+            dates = np.empty(n, 'datetime64[D]')
+            opens = np.empty(n, np.float32)
+            highs = np.empty(n, np.float32)
+            lows = np.empty(n, np.float32)
+            closes = np.empty(n, np.float32)
+            volumes = np.empty(n, np.float32)
+
+            for i, record in enumerate(bars):
+                dates[i] = record.time.date()
+                opens[i] = float(record.open)
+                highs[i] = float(record.high)
+                lows[i] = float(record.low)
+                closes[i] = float(record.close)
+                volumes[i] = float(record.volume)
+
+            order = np.argsort(dates, kind='stable')
+            return pd.DataFrame({
+                "Date": dates[order].astype('datetime64[ns]'),
+                "Open": opens[order],
+                "High": highs[order],
+                "Low": lows[order],
+                "Close": closes[order],
+                "Volume": volumes[order],
+            })
 
         except Exception as e:
             if attempt < max_retries - 1:
@@ -367,56 +624,68 @@ def get_chart_data(code, start_date, end_date):
     return None
 
 
-def calculate_momentum_and_fip_for_period(code, start_date, end_date):
-    """특정 기간에 대한 수정 12개월 모멘텀과 FIP를 계산"""
+def calculate_momentum_and_fip_for_period(code, data_start, end_date, year_start):
+    """특정 기간에 대한 수정 12개월 모멘텀과 FIP를 계산 (조회 + 계산)
+
+    날짜 경계(data_start, year_start)는 전 종목에 동일하므로
+    호출부에서 한 번만 계산해 전달받는다.
+    """
     try:
         # 데이터 가져오기 (모멘텀 계산을 위해 13개월 전부터)
-        data_start = (datetime.strptime(start_date, "%Y-%m-%d") - relativedelta(months=13)).strftime("%Y-%m-%d")
         df = get_chart_data(code, data_start, end_date)
+    except Exception as e:
+        logger.error(f"Error calculating momentum/FIP for {code}: {str(e)}")
+        return None
+    return _compute_momentum_and_fip(code, df, data_start, end_date, year_start)
+
 
+def _compute_momentum_and_fip(code, df, data_start, end_date, year_start):
+    """이미 조회된 차트 데이터에서 수정 12개월 모멘텀과 FIP를 계산"""
+    try:
         if df is None or len(df) < 250:
             return None
 
-        df['Date'] = pd.to_datetime(df['Date'])
+        # Date는 get_chart_data가 이미 datetime으로 정렬해 반환하므로
+        # 재변환 없이 searchsorted로 구간 경계만 찾아 뷰로 잘라낸다
+        dates_all = df['Date'].to_numpy()
+        i0 = np.searchsorted(dates_all, np.datetime64(data_start))
+        i1 = np.searchsorted(dates_all, np.datetime64(end_date), side='right')
 
-        # 필요한 기간 데이터만 추출
-        df_period = df[(df['Date'] >= data_start) & (df['Date'] <= end_date)].copy()
-
-        if len(df_period) < 250:  # 최소 1년 데이터 필요
+        if i1 - i0 < 250:  # 최소 1년 데이터 필요
             return None
 
-        # 월별 마지막 거래일 데이터
-        df_monthly = df_period.groupby(df_period['Date'].dt.to_period('M')).last()
-        df_monthly.index = df_monthly.index.to_timestamp()
-        df_monthly = df_monthly.sort_index()
+        dates = dates_all[i0:i1]
+        closes = df['Close'].to_numpy(np.float32, copy=False)[i0:i1]
+
+        # 월별 마지막 거래일 인덱스
+        # (정렬돼 있으므로 groupby 대신 월 경계 diff로 직접 계산)
+        months = dates.astype('datetime64[M]').astype(np.int64)
+        last_idx = np.flatnonzero(np.diff(months, append=months[-1] + 1) != 0)
 
-        if len(df_monthly) < 13:
+        if last_idx.size < 13:
             return None
 
+        monthly_closes = closes[last_idx]
+
         # 수정 12개월 모멘텀 계산 (마지막 달 제외, 11개월)
-        monthly_returns = df_monthly['Close'].pct_change().iloc[-12:-1] * 100  # 최근 12개월 중 11개월
+        monthly_returns = (monthly_closes[1:] / monthly_closes[:-1] - 1.0) * 100  # 최근 12개월 중 11개월
+        monthly_valid = monthly_returns[-12:-1]
+        monthly_valid = monthly_valid[~np.isnan(monthly_valid)]
 
-        if len(monthly_returns.dropna()) < 10:
+        if monthly_valid.size < 10:
             return None
 
-        momentum_12m_adj = 1.0
-        for ret in monthly_returns.dropna():
-            momentum_12m_adj *= (1 + ret / 100)
-        momentum_12m_adj = (momentum_12m_adj - 1) * 100
+        momentum_12m_adj = _cumulative_return(monthly_valid)
 
-        # FIP 계산을 위한 일간 데이터
-        year_start = (datetime.strptime(end_date, "%Y-%m-%d") - relativedelta(months=12)).strftime("%Y-%m-%d")
-        df_daily = df_period[df_period['Date'] >= year_start].copy()
+        # FIP 계산을 위한 일간 데이터 (뷰 슬라이스, 복사 없음)
+        j0 = np.searchsorted(dates, np.datetime64(year_start))
+        closes_daily = closes[j0:]
 
-        if len(df_daily) < 200:
+        if closes_daily.size < 200:
             return None
 
-        df_daily['Daily_Return'] = df_daily['Close'].pct_change() * 100
-        daily_returns = df_daily['Daily_Return'].dropna()
-
-        positive_days = len(daily_returns[daily_returns > 0])
-        negative_days = len(daily_returns[daily_returns < 0])
-        total_days = len(daily_returns)
+        # 상승/하락일 집계는 컴파일된 커널에서 한 번에
+        positive_days, negative_days, total_days = _count_updown_days(closes_daily)
 
         if total_days == 0:
             return None
@@ -427,17 +696,15 @@ def calculate_momentum_and_fip_for_period(code, start_date, end_date):
         momentum_sign = 1 if momentum_12m_adj > 0 else -1 if momentum_12m_adj < 0 else 0
         fip = momentum_sign * (negative_ratio - positive_ratio)
 
-        # 마지막 월의 실제 마지막 거래일 찾기
-        last_month_period = df_monthly.index[-1]
-        last_month_data = df_period[df_period['Date'].dt.to_period('M') == last_month_period.to_period('M')]
-        last_date = last_month_data['Date'].max()
+        # 마지막 월의 실제 마지막 거래일 = 해당 월의 마지막 행
+        last_date = np.datetime_as_string(dates[last_idx[-1]], unit='D')
 
         return {
             'code': code,
             'adjusted_momentum_12m': momentum_12m_adj,
             'fip': fip,
-            'end_price': df_monthly.iloc[-1]['Close'],
-            'end_price_date': last_date.strftime('%Y-%m-%d')
+            'end_price': float(monthly_closes[-1]),
+            'end_price_date': last_date
         }
 
     except Exception as e:
@@ -460,41 +727,85 @@ def select_portfolio_stocks(stock_codes, end_date, top_momentum=TOP_MOMENTUM_COU
     """
     logger.info(f"\n{end_date} 기준 포트폴리오 종목 선정 중...")
 
-    results = []
+    # 날짜 경계는 모든 종목에 동일하므로 루프 밖에서 한 번만 계산
+    end_dt = datetime.strptime(end_date, "%Y-%m-%d")
+    data_start = (end_dt - relativedelta(months=37)).strftime("%Y-%m-%d")  # 24개월 + 모멘텀용 13개월
+    year_start = (end_dt - relativedelta(months=12)).strftime("%Y-%m-%d")
+
+    # 결과는 list-of-dict 대신 미리 할당한 열 배열(SoA)에 인덱스로 기록
+    n_codes = len(stock_codes)
+    res_codes = np.empty(n_codes, dtype='U7')
+    res_momentum = np.empty(n_codes, np.float64)
+    res_fip = np.empty(n_codes, np.float64)
+    res_end_price = np.empty(n_codes, np.float64)
+    res_end_date = np.empty(n_codes, dtype='U10')
+    valid_count = 0
     processed = 0
 
-    for code in stock_codes:
-        processed += 1
-        if processed % 50 == 0:
-            logger.info(f"진행률: {processed}/{len(stock_codes)}")
-
-        # 모멘텀 계산을 위해 기준일로부터 충분한 과거 데이터가 필요한 시작일 설정
-        momentum_start = (datetime.strptime(end_date, "%Y-%m-%d") - relativedelta(months=24)).strftime("%Y-%m-%d")
-        result = calculate_momentum_and_fip_for_period(code, momentum_start, end_date)
-        if result is not None:
-            results.append(result)
+    # 조회(네트워크)와 계산(CPU)을 분리한 생산자-소비자 파이프라인:
+    # 스레드 풀이 차트를 받아 큐에 쌓는 동안 메인 스레드가 계산을 수행
+    chart_queue = queue.Queue(maxsize=64)
 
-    if len(results) < bottom_fip:
-        logger.warning(f"데이터 부족 - {len(results)}개 종목만 분석됨")
+    def _fetch_worker(code):
+        try:
+            df = get_chart_data(code, data_start, end_date)
+        except Exception as e:
+            logger.error(f"차트 조회 실패 ({code}): {str(e)}")
+            df = None
+        chart_queue.put((code, df))
+
+    with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+        for code in stock_codes:
+            executor.submit(_fetch_worker, code)
+
+        for _ in range(len(stock_codes)):
+            fetched_code, df = chart_queue.get()
+            processed += 1
+            if processed % 50 == 0:
+                logger.info(f"진행률: {processed}/{len(stock_codes)}")
+
+            result = _compute_momentum_and_fip(fetched_code, df, data_start, end_date, year_start)
+            if result is not None:
+                res_codes[valid_count] = result['code']
+                res_momentum[valid_count] = result['adjusted_momentum_12m']
+                res_fip[valid_count] = result['fip']
+                res_end_price[valid_count] = result['end_price']
+                res_end_date[valid_count] = result['end_price_date']
+                valid_count += 1
+
+    if valid_count < bottom_fip:
+        logger.warning(f"데이터 부족 - {valid_count}개 종목만 분석됨")
         return []
 
-    df_results = pd.DataFrame(results)
+    df_results = pd.DataFrame({
+        'code': res_codes[:valid_count],
+        'adjusted_momentum_12m': res_momentum[:valid_count],
+        'fip': res_fip[:valid_count],
+        'end_price': res_end_price[:valid_count],
+        'end_price_date': res_end_date[:valid_count],
+    })
 
-    # 수정 모멘텀 상위 종목 선정
+    # 수정 모멘텀 상위 N / FIP 하위 M 선정 (전체 정렬 대신 O(N) argpartition)
+    mom_arr = df_results['adjusted_momentum_12m'].to_numpy()
     actual_top_momentum = min(top_momentum, len(df_results))
-    df_top = df_results.nlargest(actual_top_momentum, 'adjusted_momentum_12m')
+    top_idx = np.argpartition(-mom_arr, actual_top_momentum - 1)[:actual_top_momentum]
+
+    fip_top = df_results['fip'].to_numpy()[top_idx]
+    actual_bottom_fip = min(bottom_fip, actual_top_momentum)
+    bot_sel = np.argpartition(fip_top, actual_bottom_fip - 1)[:actual_bottom_fip]
+    bot_sel = bot_sel[np.argsort(fip_top[bot_sel])]  # 선정된 M개만 FIP 오름차순 정렬
 
-    # FIP 기준 오름차순 정렬하여 하위 N개 선정
-    actual_bottom_fip = min(bottom_fip, len(df_top))
-    df_portfolio = df_top.nsmallest(actual_bottom_fip, 'fip')
+    df_portfolio = df_results.iloc[top_idx[bot_sel]].reset_index(drop=True)
 
     # 종목명 추가
     base_dir = Path(__file__).parent
     data_path = base_dir / "data"
 
     # KOSPI와 KOSDAQ 마스터 파일 읽기
-    df_kospi_master = pd.read_csv(data_path / "kospi_code.csv", encoding='utf-8')
-    df_kosdaq_master = pd.read_csv(data_path / "kosdaq_code.csv", encoding='utf-8')
+    # _load_master_df와 동일하게 문자열로 읽어야 단축코드의 선행 0이 유지되고
+    # 문자열 code 키와의 merge에서 dtype이 어긋나지 않는다
+    df_kospi_master = pd.read_csv(data_path / "kospi_code.csv", encoding='utf-8', dtype=str)
+    df_kosdaq_master = pd.read_csv(data_path / "kosdaq_code.csv", encoding='utf-8', dtype=str)
 
     # KOSPI는 '한글명', KOSDAQ는 '한글종목명' 컬럼 사용
     df_kospi_master = df_kospi_master[['단축코드', '한글명']].rename(columns={'한글명': '종목명'})
@@ -518,24 +829,30 @@ def select_portfolio_stocks(stock_codes, end_date, top_momentum=TOP_MOMENTUM_COU
     return df_portfolio.to_dict('records')
 
 
-def main():
-    """메인 함수"""
+def main(argv=None):
+    """메인 함수 (argv를 받아 같은 프로세스에서 바로 호출할 수 있음)"""
     global kis
 
     # 명령줄 인수 파싱
     parser = argparse.ArgumentParser(description='모멘텀 및 FIP 기반 포트폴리오 종목 선정')
     parser.add_argument('--secret', required=True, help='KIS API secret 파일 경로 (필수)')
-    args = parser.parse_args()
+    parser.add_argument('--force-refresh', action='store_true',
+                        help='당일 종목 코드 캐시를 무시하고 마스터 파일을 새로 다운로드')
+    args = parser.parse_args(argv)
 
     # PyKis 초기화
     logger.info(f"KIS API 초기화: {args.secret}")
     kis = PyKis(args.secret, keep_token=True)
+    configure_http_pool(kis)
+
+    # main() 재호출 시 이전 kis 인스턴스에 묶인 종목 객체가 남지 않도록 비움
+    _get_stock.cache_clear()
 
     # 모멘텀 계산용 필터링된 종목 코드
     print("=" * 50)
     print("모멘텀 계산용 종목 코드 다운로드")
     print("=" * 50)
-    momentum_codes = get_stock_code(filter_momentum=True)
+    momentum_codes = get_stock_code(filter_momentum=True, force_refresh=args.force_refresh)
     print(f"\n모멘텀 계산 대상 종목 {len(momentum_codes)}개")
     print(f"처음 10개 종목 코드: {momentum_codes[:10]}")
 